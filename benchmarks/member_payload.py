@@ -0,0 +1,75 @@
+"""Compares the row and columnar member chunk formats of POST /api/update/users.
+
+Usage: python benchmarks/member_payload.py [chunk size]
+"""
+
+import gzip
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from web.columnar import decode_members, encode_members  # pylint: disable=wrong-import-position
+
+GUILD_ID = 372036754078826496
+ROUNDS = 20
+
+
+def make_members(count: int) -> list[dict]:
+    """Members shaped like the MemberSerializable dumps the gateway sends today."""
+
+    rng = random.Random(0)
+    guild_roles = [rng.randrange(10**17, 10**18) for _ in range(60)]
+    members = []
+
+    for _ in range(count):
+        member_id = rng.randrange(10**17, 10**18)
+        username = f"user{rng.randrange(10**6)}"
+
+        members.append({
+            "id": member_id,
+            "username": username,
+            "display_name": username.title(),
+            "avatar_url": f"https://cdn.discordapp.com/avatars/{member_id}/{rng.getrandbits(128):032x}.png",
+            "avatar_hash": f"{rng.getrandbits(128):032x}",
+            "is_bot": rng.random() < 0.02,
+            "joined_at": "2023-06-01T12:00:00+00:00",
+            "role_ids": rng.sample(guild_roles, rng.randrange(0, 8)),
+            "guild_id": GUILD_ID,
+            "nickname": f"nick{rng.randrange(10**4)}" if rng.random() < 0.3 else None,
+            "mention": f"<@{member_id}>",
+        })
+
+    return members
+
+
+def parse_rows(body: bytes) -> int:
+    return sum(len(member["role_ids"]) for member in json.loads(body)["members"])
+
+
+def parse_columns(body: bytes) -> int:
+    return sum(len(member.role_ids) for member in decode_members(json.loads(body)))
+
+
+def main():
+    chunk_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    members = make_members(chunk_size)
+
+    row_body = json.dumps({"guild_id": GUILD_ID, "nonce": "benchmark", "members": members}).encode()
+    columnar_body = json.dumps(encode_members(GUILD_ID, "benchmark", members)).encode()
+
+    assert parse_rows(row_body) == parse_columns(columnar_body)
+
+    print(f"{chunk_size} members per chunk")
+    print(f"{'format':<10}{'bytes':>12}{'gzip bytes':>14}{'parse ms':>12}")
+
+    for name, body, parse in (("row", row_body, parse_rows), ("columnar", columnar_body, parse_columns)):
+        seconds = min(timeit.repeat(lambda body=body, parse=parse: parse(body), number=1, repeat=ROUNDS))
+        print(f"{name:<10}{len(body):>12}{len(gzip.compress(body)):>14}{seconds * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compares rendering verifiedDM templates from the compiled-template cache against parsing them on every render.
+
+Usage: python benchmarks/templates.py [renders]
+
+When bloxlink_lib is installed, parse_template() is measured as well, and every local placeholder is first
+rendered by both to check that they agree. Exits with 1 if they don't.
+"""
+
+import asyncio
+import sys
+import time
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from resources.templates import (  # pylint: disable=wrong-import-position
+    LOCAL_PLACEHOLDERS, CompiledTemplate, compile_template, render_template, template_values
+)
+
+TEMPLATE = "Welcome to {server-name}, {discord-mention}! You are now verified as {roblox-name} ({roblox-id}), also known as {display-name}."
+ROUNDS = 20
+
+
+async def check_parity(parse_template, guild_name: str, roblox_user) -> list[str]:
+    """Render every local placeholder, in every case, with both renderers. Returns the templates they disagree on."""
+
+    templates = [TEMPLATE]
+
+    for name in sorted(LOCAL_PLACEHOLDERS):
+        templates.extend((f"{{{name}}}", f"{{{name.upper()}}}", f"{{{name.title()}}}", f"[{{{name}}}] {{{name}}}"))
+
+    members = (
+        SimpleNamespace(id=84117866944663552, username="discorduser", nickname=None),
+        SimpleNamespace(id=84117866944663552, username="discorduser", nickname="Discord Nick"),
+    )
+    mismatches = []
+
+    for template in templates:
+        for member in members:
+            for max_length in (True, False):
+                kwargs = {
+                    "guild_id": 1, "guild_name": guild_name, "member": member, "roblox_user": roblox_user,
+                    "template": template, "max_length": max_length,
+                }
+                local, lib = await render_template(**kwargs), await parse_template(**kwargs)
+
+                if local != lib:
+                    mismatches.append(
+                        f"{template!r} (nickname={member.nickname!r}, max_length={max_length}): {local!r} != {lib!r}"
+                    )
+
+    return mismatches
+
+
+def main(renders: int) -> int:
+    member = SimpleNamespace(id=84117866944663552, username="discorduser", nickname=None)
+    roblox_user = SimpleNamespace(id=1, username="Roblox", display_name="Roblox Display")
+    guild_name = "Bloxlink HQ"
+
+    def uncached():
+        for _ in range(renders):
+            CompiledTemplate(TEMPLATE).render(template_values(guild_name, member, roblox_user))
+
+    def cached():
+        for _ in range(renders):
+            compile_template(TEMPLATE).render(template_values(guild_name, member, roblox_user))
+
+    results = {
+        "parse every render": min(timeit.repeat(uncached, number=1, repeat=ROUNDS)),
+        "compiled cache": min(timeit.repeat(cached, number=1, repeat=ROUNDS)),
+    }
+
+    try:
+        from bloxlink_lib import parse_template  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        print("bloxlink_lib is not installed, skipping parse_template()\n")
+    else:
+        mismatches = asyncio.run(check_parity(parse_template, guild_name, roblox_user))
+
+        if mismatches:
+            print("the local renderer disagrees with parse_template():")
+
+            for mismatch in mismatches:
+                print(f"  {mismatch}")
+
+            return 1
+
+        async def lib():
+            for _ in range(renders):
+                await parse_template(
+                    guild_id=1, guild_name=guild_name, member=member, roblox_user=roblox_user,
+                    template=TEMPLATE, max_length=False,
+                )
+
+        timings = []
+
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            asyncio.run(lib())
+            timings.append(time.perf_counter() - start)
+
+        results["bloxlink_lib parse_template"] = min(timings)
+
+    print(f"{renders} renders of a {len(TEMPLATE)} character template, best of {ROUNDS}")
+
+    for name, seconds in results.items():
+        print(f"  {name:<28} {seconds * 1000:8.2f}ms  {seconds / renders * 1e6:6.2f}us/render")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
@@ -5,7 +5,7 @@ from datetime import timedelta
 
 import hikari
 import uvicorn
-from bloxlink_lib import load_modules
+from bloxlink_lib import load_modules, create_task_log_exception
 from bloxlink_lib.database import redis
 
 from config import CONFIG
@@ -20,8 +20,10 @@ bot = Bloxlink(
 )
 
 # Load a few modules
+from resources.cache import warm_disk_caches
 from resources.commands import handle_interaction, sync_commands
 from resources.constants import MODULES
+from resources.disk_cache import disk_cache
 from web.webserver import webserver
 
 
@@ -51,6 +53,11 @@ webserver.mount("/bot", bot)
 async def handle_start(_):
     """Start the bot and sync commands"""
 
+    if disk_cache:
+        # commands and endpoints are loaded by now, so every disk-backed cache has been created
+        await warm_disk_caches()
+        create_task_log_exception(disk_cache.run_compaction())
+
     await bot.start()
 
     # only sync commands once every hour unless the --sync-commands flag is passed
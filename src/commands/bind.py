@@ -4,12 +4,14 @@ from abc import ABC
 import hikari
 from hikari.commands import CommandOption, OptionType
 
-from bloxlink_lib import get_group, get_badge, get_gamepass, get_catalog_asset, GuildBind, build_binds_desc
+from bloxlink_lib import GuildBind, build_binds_desc
+from resources.api.roblox.entities import get_group, get_badge, get_gamepass, get_catalog_asset
 from resources.binds import create_bind
 from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
 from resources.ui.components import Button, RoleSelectMenu, TextSelectMenu
 from resources.exceptions import BindConflictError, RobloxNotFound
+from resources.guilds import invalidate_guild_snapshot
 from resources.response import Prompt, PromptCustomID, PromptPageData
 
 
@@ -791,6 +793,8 @@ class GroupRolesConfirmationPrompt(Prompt[GroupPromptCustomID]):
                             name=roleset.name,
                         )
 
+                await invalidate_guild_snapshot(guild_id)
+
             if fired_component_id != "cancel":
                 try:
                     await create_bind(guild_id, bind_type="group", bind_id=self.custom_id.group_id, dynamic_roles=True)
@@ -1,6 +1,8 @@
+from resources.binds import bump_bind_config_version
 from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
 from resources.constants import DEVELOPER_GUILDS
+from resources.guild_data import invalidate_guild_data
 import hikari
 
 
@@ -17,5 +19,7 @@ class ClearServerDataCommand(GenericCommand):
         guild_id = ctx.guild_id
 
         await bloxlink.mongo.bloxlink["guilds"].delete_one({"_id": str(guild_id)})
+        await bump_bind_config_version(guild_id)
+        await invalidate_guild_data(guild_id)
 
         await ctx.response.send("Server data deleted.")
@@ -1,7 +1,7 @@
 from resources.bloxlink import instance as bloxlink
 from resources.commands import GenericCommand
 from resources.constants import DEVELOPER_GUILDS
-from bloxlink_lib.database import update_guild_data
+from resources.guild_data import update_guild_data
 
 
 @bloxlink.command(
@@ -1,7 +1,8 @@
+from resources.binds import bump_bind_config_version
 from resources.bloxlink import instance as bloxlink
 from resources.commands import GenericCommand
 from resources.constants import DEVELOPER_GUILDS
-from bloxlink_lib.database import update_guild_data
+from resources.guild_data import update_guild_data
 
 
 @bloxlink.command(
@@ -107,5 +108,6 @@ class QuickBindCommand(GenericCommand):
         ]
 
         await update_guild_data(guild_id, binds=binds)
+        await bump_bind_config_version(guild_id)
 
         await ctx.response.send("added binds")
@@ -1,6 +1,7 @@
 from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
 from resources.constants import DEVELOPER_GUILDS
+from resources.guilds import invalidate_guild_snapshot
 import hikari
 
 
@@ -27,4 +28,6 @@ class RolesCleanupCommand(GenericCommand):
                 except hikari.ForbiddenError:
                     pass
 
+        await invalidate_guild_snapshot(guild_id)
+
         await ctx.response.send("Roles cleaned up.")
@@ -1,13 +1,15 @@
 import hikari
-from bloxlink_lib import get_group, find
-from bloxlink_lib.database import fetch_guild_data, update_guild_data
+from bloxlink_lib import find
+from resources.api.roblox.entities import get_group
 from resources.bloxlink import instance as bloxlink
-from resources.binds import create_bind
+from resources.binds import create_bind, bump_bind_config_version
 from resources.commands import CommandContext, GenericCommand
 from resources.response import Prompt, PromptPageData
 from resources.ui.components import Button, TextSelectMenu, TextInput
 from resources.ui.modals import build_modal
 from resources.exceptions import RobloxNotFound
+from resources.guild_data import fetch_guild_data, update_guild_data
+from resources.guilds import fetch_guild_snapshot, invalidate_guild_snapshot
 from resources.constants import BROWN_COLOR, DEFAULTS
 
 
@@ -459,9 +461,10 @@ class SetupPrompt(Prompt):
         else:
             create_verified_role = not guild_data.verifiedRole
 
+            guild_snapshot = await fetch_guild_snapshot(self.guild_id, fresh=True)
+
             if guild_data.verifiedRole:
-                guild = await bloxlink.rest.fetch_guild(self.guild_id)
-                verified_role = find(lambda r_id, r: str(r_id) == guild_data.verifiedRole, guild.roles.items())
+                verified_role = find(lambda r_id, r: str(r_id) == guild_data.verifiedRole, guild_snapshot.roles.items())
 
                 if not verified_role:
                     create_verified_role = True
@@ -470,9 +473,14 @@ class SetupPrompt(Prompt):
 
             if create_verified_role:
                 # verifiedRole might be null but there might be a role named Verified
-                guild_roles = await bloxlink.rest.fetch_roles(self.guild_id)
-                verified_role = find(lambda r: r.name == "Verified", guild_roles) or await bloxlink.rest.create_role(self.guild_id, name="Verified")
+                verified_role = find(lambda r: r.name == "Verified", guild_snapshot.roles.values())
+
+                if not verified_role:
+                    verified_role = await bloxlink.rest.create_role(self.guild_id, name="Verified")
+                    await invalidate_guild_snapshot(self.guild_id)
+
                 await update_guild_data(self.guild_id, verifiedRole=str(verified_role.id))
+                await bump_bind_config_version(self.guild_id)
 
             to_change["verifiedRoleName"] = (
                 verified_role.name,
@@ -541,14 +549,16 @@ class SetupPrompt(Prompt):
                         pending_db_changes["verifiedRoleEnabled"] = True
 
                         # create role if it doesn't exist
-                        guild = await bloxlink.rest.fetch_guild(self.guild_id)
+                        guild_snapshot = await fetch_guild_snapshot(self.guild_id, fresh=True)
 
-                        if not find(lambda r: r.name == verified_role_name, guild.roles.values()):
+                        if not find(lambda r: r.name == verified_role_name, guild_snapshot.roles.values()):
                             verified_role = await bloxlink.rest.create_role(self.guild_id, name=verified_role_name)
                             pending_db_changes["verifiedRole"] = str(verified_role.id)
+                            await invalidate_guild_snapshot(self.guild_id)
 
                 if pending_db_changes:
                     await update_guild_data(self.guild_id, **pending_db_changes)
+                    await bump_bind_config_version(self.guild_id)
 
                 await self.edit_page(content="Successfully saved the configuration to your server.", embed=None, components=None)
 
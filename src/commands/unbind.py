@@ -3,10 +3,10 @@ import hikari
 from bloxlink_lib import VALID_BIND_TYPES, GuildBind
 from resources.ui.autocomplete import bind_category_autocomplete, bind_id_autocomplete
 from resources.ui.components import component_author_validation, TextSelectMenu, BaseCustomID, parse_custom_id, Component
+from resources.api.roblox.entities import sync_bind_entities
 from resources.binds import delete_bind, get_binds, generate_binds_embed
 from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
-from resources.exceptions import RobloxAPIError
 from resources.pagination import Paginator, PaginatorCustomID
 
 MAX_BINDS_PER_PAGE = 10
@@ -84,15 +84,10 @@ async def component_generator(items: list[GuildBind], custom_id: UnbindCustomID)
     if not items:
         return None
 
-    for i, bind in enumerate(items):
+    for i, bind in enumerate(await sync_bind_entities(items)):
         bind_type = bind.type.title()
         bind_name = str(bind.entity).replace("**", "")
 
-        try:
-            await bind.entity.sync()
-        except RobloxAPIError:
-            pass
-
         text_menu.options.append(
             TextSelectMenu.Option(
                 label=bind.short_description.replace("**", "")[:100],
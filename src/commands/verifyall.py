@@ -1,18 +1,21 @@
-import json
+import asyncio
+import functools
 from datetime import datetime, timedelta
 
 import hikari
 
-from bloxlink_lib import BaseModel, parse_into
+from bloxlink_lib import BaseModel, create_task_log_exception
 from bloxlink_lib.database import redis
 
 from resources.bloxlink import instance as bloxlink
 from resources.exceptions import Message
 from resources.commands import CommandContext, GenericCommand
-from resources.ui.components import Button, CommandCustomID, component_author_validation
-from resources.ui import ProgressBar
+from resources.progress import build_progress_embed, fetch_progress, fetch_progress_stats, is_cancelled
+from resources.ui.components import Button, CommandCustomID, component_author_validation, clean_action_rows
 
 CHUNK_LIMIT = 100
+LIVE_PROGRESS_INTERVAL = timedelta(seconds=10)
+LIVE_PROGRESS_MAX_DURATION = timedelta(days=2)
 
 
 class Response(BaseModel):
@@ -26,24 +29,12 @@ class ProgressCustomID(CommandCustomID):
 
     nonce: str
 
-class VerifyAllProgress(BaseModel):
-    """Progress of the verifyall scan"""
-
-    started_at: datetime
-    ended_at: datetime | None = None
-    members_processed: int
-    total_members: int
-    current_chunk: int
-    total_chunks: int
-
-
 
 @component_author_validation(parse_into=ProgressCustomID, defer=False)
 async def get_progress(ctx: CommandContext, custom_id: ProgressCustomID):
     """Get the progress of the verifyall scan"""
 
-    nonce = custom_id.nonce
-    progress: dict | None = json.loads(await redis.get(f"progress:{nonce}")) if await redis.exists(f"progress:{nonce}") else None
+    progress = await fetch_progress(custom_id.nonce)
 
     response = ctx.response
     message = ctx.interaction.message
@@ -52,25 +43,13 @@ async def get_progress(ctx: CommandContext, custom_id: ProgressCustomID):
         await response.send("Could not fetch progress. Perhaps it's been too long since you used this command.", ephemeral=True)
         return
 
-    parsed_progress = parse_into(progress, VerifyAllProgress)
-
-    fields = [
-        f"Started: <t:{int(parsed_progress.started_at.timestamp())}:R>",
-        f"Members processed: {parsed_progress.members_processed}/{parsed_progress.total_members}",
-        f"Chunks processed: {parsed_progress.current_chunk}/{parsed_progress.total_chunks}",
-        "Progress: " + str(ProgressBar(progress=parsed_progress.current_chunk, total=parsed_progress.total_chunks))
-    ]
-
-    if parsed_progress.ended_at:
-        fields.insert(1, f"Ended: <t:{int(parsed_progress.ended_at.timestamp())}:R>")
-
-    embed = hikari.Embed(
-        title="Progress Update" if not parsed_progress.ended_at else "Scan Complete",
-        description="\n".join(fields),
+    embed = build_progress_embed(
+        progress,
+        await fetch_progress_stats(custom_id.nonce),
+        footer="Progress bar is updated at every chunk completed"
     )
-    embed.set_footer(text="Progress bar is updated at every chunk completed")
 
-    if parsed_progress.ended_at:
+    if progress.ended_at:
         for action_row in message.components:
             for component in action_row.components:
                 component.is_disabled = True
@@ -85,7 +64,7 @@ async def cancel_progress(ctx: CommandContext, custom_id: ProgressCustomID):
     """Cancel the verifyall scan."""
 
     nonce = custom_id.nonce
-    progress: dict | None = json.loads(await redis.get(f"progress:{nonce}")) if await redis.exists(f"progress:{nonce}") else None
+    progress = await fetch_progress(nonce)
 
     response = ctx.response
     message = ctx.interaction.message
@@ -96,20 +75,7 @@ async def cancel_progress(ctx: CommandContext, custom_id: ProgressCustomID):
 
     await redis.set(f"progress:{nonce}:cancelled", "1", expire=timedelta(days=2))
 
-    parsed_progress = parse_into(progress, VerifyAllProgress)
-
-    fields = [
-        f"Started: <t:{int(parsed_progress.started_at.timestamp())}:R>",
-        f"Ended: <t:{int(datetime.now().timestamp())}:R>",
-        f"Members processed: {parsed_progress.members_processed}/{parsed_progress.total_members}",
-        f"Chunks processed: {parsed_progress.current_chunk}/{parsed_progress.total_chunks}",
-        "Progress: " + str(ProgressBar(progress=parsed_progress.current_chunk, total=parsed_progress.total_chunks))
-    ]
-
-    embed = hikari.Embed(
-        title="Scan Complete (Cancelled)",
-        description="\n".join(fields),
-    )
+    embed = build_progress_embed(progress, await fetch_progress_stats(nonce), cancelled_at=datetime.now())
 
     for action_row in message.components:
         for component in action_row.components:
@@ -121,6 +87,70 @@ async def cancel_progress(ctx: CommandContext, custom_id: ProgressCustomID):
     await response.send("Successfully cancelled the scan.", ephemeral=True)
 
 
+async def live_progress(nonce: str, message: hikari.Message, components: list[Button]):
+    """Keep the progress message of a verifyall scan up to date without the user pressing the Progress button.
+
+    Only one coordinator runs per scan. It reads the progress that every node contributes to and
+    edits the message at most once per LIVE_PROGRESS_INTERVAL, skipping edits when nothing changed.
+
+    Args:
+        nonce (str): The nonce of the scan.
+        message (hikari.Message): The message to keep updated.
+        components (list[Button]): The components of the message. These are disabled when the scan ends.
+    """
+
+    coordinator_key = f"progress:{nonce}:coordinator"
+
+    # claimed with its expiry in one command, so a crash can't leave a claim that blocks live progress forever
+    if not await redis.set(coordinator_key, "1", nx=True, ex=LIVE_PROGRESS_MAX_DURATION):
+        return
+
+    last_description: str = None
+    stop_at = datetime.now() + LIVE_PROGRESS_MAX_DURATION
+
+    while datetime.now() < stop_at:
+        await asyncio.sleep(LIVE_PROGRESS_INTERVAL.total_seconds())
+
+        progress = await fetch_progress(nonce)
+        stats = await fetch_progress_stats(nonce)
+
+        if not progress:
+            return
+
+        # the cancel button already edited the message, unless the scan was stopped by us
+        if await is_cancelled(nonce) and not stats.halted_reason:
+            return
+
+        finished = bool(progress.ended_at or stats.halted_reason)
+
+        embed = build_progress_embed(
+            progress,
+            stats,
+            footer=f"This message updates every {int(LIVE_PROGRESS_INTERVAL.total_seconds())} seconds" if not finished else None
+        )
+
+        if finished:
+            for component in components:
+                component.is_disabled = True
+
+        if embed.description != last_description or finished:
+            try:
+                await bloxlink.rest.edit_message(
+                    message.channel_id,
+                    message.id,
+                    embed=embed,
+                    components=clean_action_rows(
+                        functools.reduce(lambda a, c: c.build(a), components, [bloxlink.rest.build_message_action_row()])
+                    ),
+                )
+            except (hikari.ForbiddenError, hikari.NotFoundError):
+                # message was deleted or we lost access to the channel, nothing left to update
+                return
+
+            last_description = embed.description
+
+        if finished:
+            return
 
 
 @bloxlink.command(
@@ -128,6 +158,14 @@ async def cancel_progress(ctx: CommandContext, custom_id: ProgressCustomID):
     premium=True,
     defer=True,
     permissions=hikari.Permissions.MANAGE_GUILD | hikari.Permissions.MANAGE_ROLES,
+    options=[
+        hikari.commands.CommandOption(
+            type=hikari.commands.OptionType.BOOLEAN,
+            name="live_progress",
+            description="Keep the progress message updated automatically instead of using a Progress button.",
+            is_required=False,
+        ),
+    ],
     accepted_custom_ids={
         "verifyall:verifyall_progress_button": get_progress,
         "verifyall:verifyall_cancel_button": cancel_progress
@@ -149,6 +187,7 @@ class VerifyallCommand(GenericCommand):
 
         guild_id = ctx.interaction.guild_id
         response = ctx.response
+        live = bool(ctx.options.get("live_progress"))
 
         progress_responses = await bloxlink.relay(
             "VERIFYALL",
@@ -171,19 +210,13 @@ class VerifyallCommand(GenericCommand):
 
         embed = hikari.Embed(
             title="Now Updating Everyone...",
-            description="Your server members will be updated shortly!\nPlease feel free to press the Progress button for the latest progress.",
+            description=(
+                "Your server members will be updated shortly!\n"
+                + ("This message will be updated with the latest progress." if live else "Please feel free to press the Progress button for the latest progress.")
+            ),
         )
 
         components = [
-            Button(
-                label="Progress",
-                custom_id=str(ProgressCustomID(
-                    nonce=progress_response.nonce,
-                    command_name="verifyall",
-                    user_id=ctx.user.id,
-                    section="verifyall_progress_button")
-                ),
-            ),
             Button(
                 label="Stop Scan",
                 custom_id=str(ProgressCustomID(
@@ -196,4 +229,18 @@ class VerifyallCommand(GenericCommand):
             )
         ]
 
-        await response.send(embed=embed, components=components)
+        if not live:
+            components.insert(0, Button(
+                label="Progress",
+                custom_id=str(ProgressCustomID(
+                    nonce=progress_response.nonce,
+                    command_name="verifyall",
+                    user_id=ctx.user.id,
+                    section="verifyall_progress_button")
+                ),
+            ))
+
+        message = await response.send(embed=embed, components=components)
+
+        if live and message:
+            create_task_log_exception(live_progress(progress_response.nonce, message, components))
@@ -4,6 +4,7 @@ from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
 from resources.ui.components import Button, TextInput
 from resources.ui.modals import build_modal
+from resources.guilds import fetch_guild_snapshot
 from resources.premium import get_premium_status
 from resources import binds
 from resources.api.roblox import users
@@ -49,7 +50,7 @@ class VerifyChannelCommand(GenericCommand):
     async def __main__(self, ctx: CommandContext):
         guild_id = ctx.guild_id
 
-        guild: hikari.RESTGuild = await bloxlink.rest.fetch_guild(guild_id)
+        guild_snapshot = await fetch_guild_snapshot(guild_id)
         premium_status = await get_premium_status(guild_id=guild_id, interaction=ctx.interaction)
 
         button_text = "Verify with Bloxlink"
@@ -109,7 +110,7 @@ class VerifyChannelCommand(GenericCommand):
 
         await ctx.response.send(
             message_text.format(**{
-                "server-name": guild.name
+                "server-name": guild_snapshot.name
             }),
             components=button_menu,
             channel=await ctx.interaction.fetch_channel()
@@ -1,7 +1,7 @@
 import hikari
-from bloxlink_lib import VALID_BIND_TYPES, GuildBind, get_binds
+from bloxlink_lib import VALID_BIND_TYPES, GuildBind
 
-from resources.binds import generate_binds_embed
+from resources.binds import get_binds, generate_binds_embed
 from resources.bloxlink import instance as bloxlink
 from resources.commands import CommandContext, GenericCommand
 from resources.pagination import Paginator, PaginatorCustomID
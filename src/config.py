@@ -23,6 +23,9 @@ class Config(BLOXLINK_CONFIG):
     HTTP_BOT_AUTH: str
     #############################
     ROBLOX_INFO_SERVER: str
+    #############################
+    DISK_CACHE_PATH: str | None = None # keeps Roblox lookups across restarts when set, should be on local disk
+    DISK_CACHE_MAX_MB: int = Field(default=512)
 
 
 CONFIG: Config = Config(
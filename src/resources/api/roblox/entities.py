@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import timedelta
+from typing import TYPE_CHECKING, Iterable
+
+from bloxlink_lib import create_entity
+
+from resources.cache import Cache
+from resources.exceptions import RobloxAPIError, RobloxNotFound
+
+if TYPE_CHECKING:
+    from bloxlink_lib import GuildBind, RobloxEntity
+
+
+__all__ = (
+    "get_entity",
+    "get_entities",
+    "sync_bind_entities",
+    "get_group",
+    "get_badge",
+    "get_gamepass",
+    "get_catalog_asset",
+)
+
+# Names of badges, gamepasses and assets rarely change. Groups carry their rank list, which owners do edit.
+ENTITY_TTL = timedelta(hours=6)
+GROUP_TTL = timedelta(minutes=10)
+
+# Entities that don't exist, so repeatedly rendering a bind of a deleted entity doesn't hit Roblox every time.
+NOT_FOUND_TTL = timedelta(minutes=10)
+
+# How many entities get_entities() syncs at once.
+MAX_CONCURRENT_SYNCS = 10
+
+
+def _decode_entity(entity_type: str, data: str) -> RobloxEntity:
+    entity_class = type(create_entity(entity_type, json.loads(data)["id"]))
+
+    return entity_class.model_validate_json(data)
+
+
+def _entity_cache(entity_type: str, ttl: timedelta, max_entries: int) -> Cache[str, "RobloxEntity"]:
+    """A cache of one type of entity, which is kept on disk when the disk cache is enabled."""
+
+    return Cache(
+        f"roblox_entity:{entity_type}",
+        ttl=ttl,
+        negative_ttl=NOT_FOUND_TTL,
+        max_entries=max_entries,
+        use_disk=True,
+        encode=lambda entity: entity.model_dump_json(by_alias=True),
+        decode=lambda data: _decode_entity(entity_type, data),
+    )
+
+
+_entity_caches: dict[str, Cache[str, "RobloxEntity"]] = {
+    "group": _entity_cache("group", GROUP_TTL, 20_000),
+    "badge": _entity_cache("badge", ENTITY_TTL, 20_000),
+    "gamepass": _entity_cache("gamepass", ENTITY_TTL, 20_000),
+    "asset": _entity_cache("asset", ENTITY_TTL, 20_000),
+}
+
+
+async def _load_entity(entity_type: str, entity_id: str) -> RobloxEntity | None:
+    entity = create_entity(entity_type, entity_id)
+
+    try:
+        await entity.sync()
+    except RobloxNotFound:
+        return None
+
+    return entity
+
+
+async def get_entity(entity_type: str, entity_id: int | str) -> RobloxEntity | None:
+    """Get a synced Roblox entity, from the cache when possible.
+    The returned entity is shared with other callers, so it must not be modified.
+
+    Args:
+        entity_type (str): The bind type of the entity, such as "group" or "badge".
+        entity_id (int | str): The ID of the entity.
+
+    Raises:
+        RobloxAPIError: When Roblox can't be reached. Failures aren't cached.
+
+    Returns:
+        RobloxEntity | None: The synced entity, or None if it doesn't exist.
+    """
+
+    entity_id = str(entity_id)
+    cache = _entity_caches.get(entity_type)
+
+    if cache is None:
+        return await _load_entity(entity_type, entity_id)
+
+    return await cache.get(entity_id, lambda: _load_entity(entity_type, entity_id))
+
+
+async def get_entities(entities: Iterable[tuple[str, int | str]]) -> dict[tuple[str, str], RobloxEntity | None]:
+    """Get many synced Roblox entities at once. Cached entities are returned straight away and the rest are
+    synced concurrently, at most MAX_CONCURRENT_SYNCS at a time.
+
+    Args:
+        entities (Iterable[tuple[str, int | str]]): (type, ID) pairs. Duplicates are only synced once.
+
+    Returns:
+        dict[tuple[str, str], RobloxEntity | None]: The entities keyed by (type, ID as a string). Entities that
+            don't exist are None, and entities that couldn't be synced because of a Roblox error are left out.
+    """
+
+    keys = {(entity_type, str(entity_id)) for entity_type, entity_id in entities}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SYNCS)
+
+    async def _get(entity_type: str, entity_id: str):
+        async with semaphore:
+            return await get_entity(entity_type, entity_id)
+
+    keys = list(keys)
+    results = await asyncio.gather(*(_get(*key) for key in keys), return_exceptions=True)
+    synced: dict[tuple[str, str], RobloxEntity | None] = {}
+
+    for key, result in zip(keys, results):
+        if isinstance(result, RobloxAPIError):
+            continue
+
+        if isinstance(result, BaseException):
+            raise result
+
+        synced[key] = result
+
+    return synced
+
+
+async def sync_bind_entities(binds: Iterable[GuildBind]) -> list[GuildBind]:
+    """Resolve the entities of all binds in one pass.
+
+    The given binds may be shared through the bind cache, so they are left alone. Binds whose entity was
+    synced are copied with it instead, and binds whose entity couldn't be synced are returned as they are.
+
+    Returns:
+        list[GuildBind]: The binds in the same order, with their synced entities.
+    """
+
+    binds = list(binds)
+    synced = await get_entities((bind.type, bind.criteria.id) for bind in binds if bind.criteria.id)
+    synced_binds: list[GuildBind] = []
+
+    for bind in binds:
+        entity = synced.get((bind.type, str(bind.criteria.id)))
+        synced_binds.append(bind.model_copy(update={"entity": entity}) if entity is not None else bind)
+
+    return synced_binds
+
+
+async def _get_or_raise(entity_type: str, entity_id: int | str) -> RobloxEntity:
+    entity = await get_entity(entity_type, entity_id)
+
+    if entity is None:
+        raise RobloxNotFound(f"This {entity_type} does not exist.")
+
+    return entity
+
+
+async def get_group(group_id: int | str) -> RobloxEntity:
+    """get_group() of bloxlink_lib, cached. Raises RobloxNotFound when the group doesn't exist."""
+
+    return await _get_or_raise("group", group_id)
+
+
+async def get_badge(badge_id: int | str) -> RobloxEntity:
+    """get_badge() of bloxlink_lib, cached. Raises RobloxNotFound when the badge doesn't exist."""
+
+    return await _get_or_raise("badge", badge_id)
+
+
+async def get_gamepass(gamepass_id: int | str) -> RobloxEntity:
+    """get_gamepass() of bloxlink_lib, cached. Raises RobloxNotFound when the gamepass doesn't exist."""
+
+    return await _get_or_raise("gamepass", gamepass_id)
+
+
+async def get_catalog_asset(asset_id: int | str) -> RobloxEntity:
+    """get_catalog_asset() of bloxlink_lib, cached. Raises RobloxNotFound when the asset doesn't exist."""
+
+    return await _get_or_raise("asset", asset_id)
@@ -1,19 +1,96 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import re
 from datetime import timedelta
+from typing import Iterable
 
-from bloxlink_lib import RobloxUser, get_user, fetch, StatusCodes
-from bloxlink_lib.database import fetch_guild_data, redis
+from bloxlink_lib import RobloxUser, get_user, get_user_account, fetch, StatusCodes
+from bloxlink_lib.database import redis
 import hikari
 
+from resources.bloxlink import instance as bloxlink
+from resources.cache import Cache
 from resources.constants import VERIFY_URL, VERIFY_URL_GUILD
-from resources.exceptions import RobloxAPIError, RobloxNotFound
+from resources.exceptions import RobloxAPIError, RobloxNotFound, RobloxDown
+from resources.guild_data import fetch_guild_data
 from resources.premium import get_premium_status
+from resources.unit_of_work import memoize, prime_memoized
+
+
+# Anything else can't be a username, so it isn't looked up.
+USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9_]{3,20}$")
+
+# Roblox users by ID, and the IDs of users by lowercase username. Entries past their TTL are served while they
+# refresh in the background, so autocomplete keystrokes and the command that follows resolve from memory.
+# Unknown IDs and usernames are cached as None.
+roblox_users_cache: Cache[str, RobloxUser] = Cache(
+    "roblox_user",
+    ttl=timedelta(minutes=5),
+    stale_ttl=timedelta(hours=1),
+    negative_ttl=timedelta(minutes=5),
+    max_entries=50_000,
+    use_disk=True,
+    encode=lambda user: user.model_dump_json(by_alias=True),
+    decode=RobloxUser.model_validate_json,
+)
+roblox_usernames_cache: Cache[str, str] = Cache(
+    "roblox_username",
+    ttl=timedelta(minutes=30),
+    stale_ttl=timedelta(hours=6),
+    negative_ttl=timedelta(minutes=5),
+    max_entries=100_000,
+    use_disk=True,
+    encode=str,
+    decode=str,
+)
+
+
+async def _load_user_by_id(roblox_id: str) -> RobloxUser | None:
+    try:
+        account = await get_user(roblox_id=roblox_id)
+    except RobloxNotFound:
+        return None
+
+    await roblox_usernames_cache.set(account.username.lower(), str(account.id))
+
+    return account
+
+
+async def _load_user_id_by_username(username: str) -> str | None:
+    try:
+        account = await get_user(roblox_username=username)
+    except RobloxNotFound:
+        return None
+
+    await roblox_users_cache.set(str(account.id), account)
+
+    return str(account.id)
+
+
+async def get_user_by_id(roblox_id: int | str) -> RobloxUser | None:
+    """Get a Roblox user by ID, from the cache when possible. Returns None when the user doesn't exist."""
+
+    roblox_id = str(roblox_id)
+
+    return await roblox_users_cache.get(roblox_id, lambda: _load_user_by_id(roblox_id))
+
+
+async def get_user_by_username(username: str) -> RobloxUser | None:
+    """Get a Roblox user by username, from the cache when possible. Returns None when the user doesn't exist."""
+
+    username = username.lower()
+    roblox_id = await roblox_usernames_cache.get(username, lambda: _load_user_id_by_username(username))
+
+    return await get_user_by_id(roblox_id) if roblox_id else None
 
 
 async def get_user_from_string(target: str) -> RobloxUser:
     """Get a RobloxAccount from a given target string (either an ID or username)
 
+    Lookups are cached, so the returned account is shared with other callers.
+
     Args:
         target (str): Roblox ID or username of the account to sync.
 
@@ -27,19 +104,122 @@ async def get_user_from_string(target: str) -> RobloxUser:
 
     account = None
 
-    if target.isdigit():
-        try:
-            account = await get_user(roblox_id=target)
-        except (RobloxNotFound, RobloxAPIError):
-            pass
+    # Numeric input may be an ID or a username, so both are looked up at once and the ID wins.
+    username_lookup = asyncio.create_task(get_user_by_username(target)) if USERNAME_PATTERN.match(target) else None
+
+    if username_lookup:
+        # the ID lookup may win, in which case nobody awaits this
+        username_lookup.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    try:
+        if target.isdigit():
+            try:
+                account = await get_user_by_id(target)
+            except RobloxAPIError:
+                pass
+
+        # Fallback to parse input as a username if the input was not a valid id.
+        if not account and username_lookup:
+            account = await username_lookup
+
+    finally:
+        if username_lookup and not username_lookup.done():
+            username_lookup.cancel()
 
-    # Fallback to parse input as a username if the input was not a valid id.
     if not account:
-        account = await get_user(roblox_username=target)
+        raise RobloxNotFound("The Roblox user you were searching for does not exist.")
 
     return account
 
 
+def _linked_account_key(user_id: int | str, guild_id: int | str | None) -> tuple[int, int | None]:
+    return int(user_id), int(guild_id) if guild_id else None
+
+
+async def get_linked_account(user_id: int | str, guild_id: int | str = None) -> RobloxUser | None:
+    """get_user_account() without raising errors, read once per unit of work.
+
+    Args:
+        user_id (int | str): The Discord ID of the user.
+        guild_id (int | str, optional): Prefer the account the user linked to this guild. Defaults to None.
+
+    Returns:
+        RobloxUser | None: The linked account, or None if the user is not verified.
+    """
+
+    return await memoize(
+        "linked_account",
+        _linked_account_key(user_id, guild_id),
+        lambda: get_user_account(user_id, guild_id=guild_id, raise_errors=False),
+    )
+
+
+def prime_linked_account(user_id: int | str, guild_id: int | str | None, account: RobloxUser | None):
+    """Record the linked account of a user that was loaded in bulk, such as by get_user_accounts()."""
+
+    prime_memoized("linked_account", _linked_account_key(user_id, guild_id), account)
+
+
+async def get_user_accounts(user_ids: list[int | str], guild_id: int | str = None) -> dict[int, RobloxUser]:
+    """Get the linked Roblox accounts of many Discord users with a single database query.
+
+    This is the bulk version of get_user_account(), used when updating a chunk of members.
+
+    Args:
+        user_ids (list[int | str]): The Discord IDs of the users.
+        guild_id (int | str, optional): Prefer the account each user linked to this guild. Defaults to None.
+
+    Returns:
+        dict[int, RobloxUser]: The linked accounts, keyed by Discord ID. Unverified users are left out.
+    """
+
+    if not user_ids:
+        return {}
+
+    accounts: dict[int, RobloxUser] = {}
+
+    cursor = bloxlink.mongo.bloxlink["users"].find(
+        {"_id": {"$in": [str(user_id) for user_id in user_ids]}},
+        {"robloxID": 1, "robloxAccounts.guilds": 1},
+    )
+
+    async for user_data in cursor:
+        roblox_id = None
+
+        if guild_id:
+            roblox_id = ((user_data.get("robloxAccounts") or {}).get("guilds") or {}).get(str(guild_id))
+
+        roblox_id = roblox_id or user_data.get("robloxID")
+
+        if roblox_id:
+            accounts[int(user_data["_id"])] = RobloxUser(id=roblox_id)
+
+    return accounts
+
+
+async def sync_accounts(accounts: Iterable[RobloxUser], includes: list[str] = None, *, concurrency: int = 10):
+    """Sync many Roblox accounts against the info server at once, with at most `concurrency` requests in flight.
+
+    Accounts that fail to sync are left as they were, so callers can still fall back to syncing them one by one.
+
+    Args:
+        accounts (Iterable[RobloxUser]): The accounts to sync.
+        includes (list[str], optional): Extra data to load, such as ["groups"]. Defaults to None.
+        concurrency (int, optional): The maximum amount of concurrent requests. Defaults to 10.
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def sync_account(account: RobloxUser):
+        async with semaphore:
+            try:
+                await account.sync(includes)
+            except (RobloxNotFound, RobloxAPIError, RobloxDown) as ex:
+                logging.debug(f"Failed to sync Roblox account {account.id}: {ex}")
+
+    await asyncio.gather(*(sync_account(account) for account in accounts))
+
+
 async def format_embed(roblox_account: RobloxUser, user: hikari.User = None, guild_id: int = None) -> list[hikari.Embed]:
     """Create an embed displaying information about a user.
 
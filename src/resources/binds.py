@@ -5,17 +5,25 @@ from typing import TYPE_CHECKING, Unpack
 
 from datetime import timedelta
 import hikari
-from bloxlink_lib import MemberSerializable, GuildSerializable, fetch_typed, StatusCodes, GuildBind, get_binds, BaseModel, create_entity, count_binds, VALID_BIND_TYPES, BindCriteriaDict, parse_template, SnowflakeSet
-from bloxlink_lib.database import fetch_user_data, update_user_data, update_guild_data, fetch_guild_data
+from bloxlink_lib import get_binds as get_binds_uncached
+from bloxlink_lib import MemberSerializable, GuildSerializable, fetch_typed, StatusCodes, GuildBind, BaseModel, create_entity, count_binds, VALID_BIND_TYPES, BindCriteriaDict, SnowflakeSet
+from bloxlink_lib.database import fetch_user_data, redis
 from pydantic import Field
 
 from resources import restriction
 from resources.api.roblox import users
+from resources.api.roblox.entities import get_entities, sync_bind_entities
 from resources.bloxlink import instance as bloxlink
+from resources.cache import Cache
 from resources.constants import LIMITS, ORANGE_COLOR
-from resources.exceptions import Message, RobloxNotFound, BindConflictError, BindException, PremiumRequired, BloxlinkForbidden
+from resources.exceptions import Message, BindConflictError, BindException, PremiumRequired, BloxlinkForbidden
+from resources.guild_data import fetch_guild_data, update_guild_data
+from resources.guilds import fetch_guild_snapshot, invalidate_guild_snapshot
 from resources.ui.embeds import InteractiveMessage
 from resources.premium import get_premium_status
+from resources.reverse_lookup import update_user_data
+from resources.templates import render_template
+from resources.unit_of_work import forget_memoized, memoize, prime_memoized
 from resources.ui.components import Button, Component
 from config import CONFIG
 
@@ -39,6 +47,80 @@ class UpdateEndpointResponse(BaseModel):
     missing_roles: list[str] = Field(alias="missingRoles")
 
 
+async def get_bind_config_version(guild_id: int | str) -> int:
+    """Get the bind-config version of a guild. This is bumped whenever the binds or
+    bind-related settings of the guild change. Read once per unit of work.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+
+    Returns:
+        int: The current version, 0 if the guild never changed its binds since we started tracking it.
+    """
+
+    return await memoize("bind_config_version", str(guild_id), lambda: _fetch_bind_config_version(guild_id))
+
+
+async def _fetch_bind_config_version(guild_id: int | str) -> int:
+    version = await redis.get(f"binds_version:{guild_id}")
+
+    return int(version) if version else 0
+
+
+async def bump_bind_config_version(guild_id: int | str) -> int:
+    """Atomically increment the bind-config version of a guild. Call this after every bind write.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+
+    Returns:
+        int: The new version.
+    """
+
+    version = await redis.incr(f"binds_version:{guild_id}")
+
+    # later reads in this unit of work see the write
+    prime_memoized("bind_config_version", str(guild_id), version)
+    forget_memoized("bind_count", str(guild_id))
+
+    return version
+
+
+# The binds of each guild, keyed by the bind-config version they were read at. A bump orphans every older copy,
+# which age out of the LRU. Writes that skip the bump are picked up after the TTL.
+guild_binds_cache: Cache[str, list[GuildBind]] = Cache("guild_binds", ttl=timedelta(minutes=10), max_entries=20_000)
+
+
+async def get_binds(
+    guild_id: int | str,
+    category: VALID_BIND_TYPES = None,
+    bind_id: int = None,
+) -> list[GuildBind]:
+    """get_binds() of bloxlink_lib, cached until the bind-config version of the guild changes.
+    Only the version is read from Redis when the binds are cached.
+
+    The returned list is a copy, but the binds in it are shared with other callers and must not be modified.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+        category (VALID_BIND_TYPES, optional): Only return binds of this type. Defaults to None.
+        bind_id (int, optional): Only return binds of this entity. Defaults to None.
+
+    Returns:
+        list[GuildBind]: The binds of the guild.
+    """
+
+    guild_id = str(guild_id)
+    version = await get_bind_config_version(guild_id)
+    key = f"{guild_id}:{version}:{category}:{bind_id}"
+
+    guild_binds = await guild_binds_cache.get(
+        key, lambda: get_binds_uncached(guild_id, category=category, bind_id=bind_id)
+    )
+
+    return list(guild_binds)
+
+
 def convert_v3_binds_to_v4(items: dict, bind_type: VALID_BIND_TYPES) -> list:
     """Convert old bindings to the new bind format.
 
@@ -130,19 +212,15 @@ async def convert_v4_binds_to_v3(items: list) -> dict:
     }
     entire_groups = {}
 
-    for bind in items:
-        if isinstance(bind, GuildBind):
-            bind = asdict(bind)
+    items = [asdict(bind) if isinstance(bind, GuildBind) else bind for bind in items]
+    entities = await get_entities((bind["bind"]["type"], bind["bind"]["id"]) for bind in items)
 
+    for bind in items:
         sub_data = bind["bind"]
         bind_type = sub_data["type"]
         bind_id = str(sub_data["id"])
 
-        bind_entity = create_entity(bind_type, bind_id)
-        try:
-            await bind_entity.sync()
-        except RobloxNotFound:
-            pass
+        bind_entity = entities.get((bind_type, bind_id)) or create_entity(bind_type, bind_id)
 
         if bind_type in ("asset", "badge", "gamepass"):
             if bind_type == "gamepass":
@@ -254,7 +332,7 @@ async def create_bind(
         BindException: _description_
     """
 
-    bind_count = await count_binds(guild_id)
+    bind_count = await memoize("bind_count", str(guild_id), lambda: count_binds(guild_id))
     roles = roles or []
     remove_roles = remove_roles or []
 
@@ -300,6 +378,7 @@ async def create_bind(
         guild_binds.append(new_bind)
 
         await update_guild_data(guild_id, binds=[b.model_dump(exclude_unset=True, by_alias=True) for b in guild_binds])
+        await bump_bind_config_version(guild_id)
 
         return
 
@@ -321,6 +400,7 @@ async def create_bind(
             # index, then remove, then insert again at that index.
             guild_binds.remove(existing_binds[0])
 
+            existing_binds[0] = existing_binds[0].model_copy()
             existing_binds[0].roles = list(guild_roles & existing_roles)
             guild_binds.append(existing_binds[0])
 
@@ -328,10 +408,12 @@ async def create_bind(
             # Override roles to remove rather than append.
             guild_binds.remove(existing_binds[0])
 
+            existing_binds[0] = existing_binds[0].model_copy()
             existing_binds[0].remove_roles = remove_roles
             guild_binds.append(existing_binds[0])
 
         await update_guild_data(guild_id, binds=[b.model_dump(exclude_unset=True, by_alias=True) for b in guild_binds])
+        await bump_bind_config_version(guild_id)
 
     else:
         # everything else (verified/unverified binds)
@@ -360,6 +442,7 @@ async def delete_bind(
         guild_binds.remove(bind)
 
     await update_guild_data(guild_id, binds=[b.model_dump(exclude_unset=True, by_alias=True) for b in guild_binds])
+    await bump_bind_config_version(guild_id)
 
 
 async def calculate_bound_roles(guild: hikari.RESTGuild, member: hikari.Member | MemberSerializable, roblox_user: users.RobloxAccount = None) -> UpdateEndpointResponse:
@@ -425,8 +508,10 @@ async def apply_binds(
     if roblox_account and roblox_account.groups is None:
         await roblox_account.sync(["groups"])
 
-    guild: hikari.RESTGuild = await bloxlink.rest.fetch_guild(guild_id)
-    guild_roles = guild.roles
+    guild_snapshot = await fetch_guild_snapshot(guild_id)
+    guild: hikari.RESTGuild = guild_snapshot.guild
+    # copied, since roles created below are added to it and the snapshot is shared with other updates
+    guild_roles = dict(guild.roles)
     guild_data = await fetch_guild_data(guild_id, "verifiedDM")
 
     embed = hikari.Embed()
@@ -487,31 +572,38 @@ async def apply_binds(
     nickname = update_payload.nickname
 
     if update_payload.missing_roles:
-        for role_name in update_payload.missing_roles:
-            try:
+        try:
+            for role_name in update_payload.missing_roles:
                 new_role: hikari.Role = await bloxlink.rest.create_role(
                     guild_id, name=role_name, reason="Creating missing role"
                 )
                 add_roles.add(new_role.id)
                 guild_roles[new_role.id] = new_role # so str_reference can be updated
 
-            except hikari.ForbiddenError:
-                return InteractiveMessage(embed_description=(
-                    "I don't have permission to create roles on this server."
-                ))
+        except hikari.ForbiddenError:
+            return InteractiveMessage(embed_description=(
+                "I don't have permission to create roles on this server."
+            ))
+
+        finally:
+            await invalidate_guild_snapshot(guild_id)
 
     # Apply roles and nickname to the user
     # We do roles and nickname separately so if the nickname fails, the roles still apply.
     # (It would take more HTTP requests to fetch the top roles of both the user and the bot)
     if add_roles or remove_roles:
         try:
-            await bloxlink.edit_user(member=member,
+            edited_member = await bloxlink.edit_user(member=member,
                                     guild_id=guild_id,
                                     add_roles=add_roles,
                                     remove_roles=remove_roles)
         except hikari.ForbiddenError:
             raise BloxlinkForbidden("I don't have permission to add roles to this user.") from None
 
+        if isinstance(member, MemberSerializable):
+            # keep the serialized member in line with Discord so callers see the roles it has now
+            member.role_ids = list(edited_member.role_ids)
+
     if nickname and guild.owner_id != member.id:
         try:
             await bloxlink.edit_user(member=member,
@@ -519,6 +611,9 @@ async def apply_binds(
                                     nickname=nickname)
         except hikari.ForbiddenError:
             warnings.append("I don't have permission to change this user's nickname.")
+        else:
+            if isinstance(member, MemberSerializable):
+                member.nickname = nickname
 
     # Build response embed
     if roblox_account or update_embed_for_unverified or CONFIG.BOT_RELEASE == "LOCAL":
@@ -570,7 +665,8 @@ async def apply_binds(
         ]
 
     return InteractiveMessage(
-        content="To verify with Bloxlink, click the link below." if not roblox_account else await parse_template(
+        binds_applied=True,
+        content="To verify with Bloxlink, click the link below." if not roblox_account else await render_template(
             guild_id=guild_id,
             guild_name=guild.name,
             member=member,
@@ -633,9 +729,7 @@ async def generate_binds_embed(items: list[GuildBind], embed: hikari.Embed):
 
     bind_list: dict[str, list[str]] = {}
 
-    for bind in items:
-        await bind.entity.sync()
-
+    for bind in await sync_bind_entities(items):
         bind_entity = str(bind.entity)
 
         if bind_entity not in bind_list:
@@ -175,7 +175,10 @@ class Bloxlink(yuyo.AsgiBot):
         return await self.rest.edit_member(**args)
 
     async def fetch_roles(self, guild_id: str | int, key_as_role_name: bool = False) -> dict[str, hikari.Role]:
-        """guild.fetch_roles() but returns a dictionary instead"""
+        """guild.fetch_roles() but returns a dictionary instead.
+
+        Always fetched over REST, since the commands that call this act on the roles right away.
+        """
 
         return {str(role.name if key_as_role_name else role.id): role for role in await self.rest.fetch_roles(guild_id)}
 
@@ -189,10 +192,12 @@ class Bloxlink(yuyo.AsgiBot):
         Returns:
             str: Comma separated string of the names for all the role IDs given.
         """
-        # TODO: Use redis -> gateway comms to get role data/role names.
-        # For now this just makes a http request every time it needs it.
 
-        guild_roles = await self.fetch_roles(guild_id)
+        from resources.guilds import fetch_guild_snapshot # pylint: disable=import-outside-toplevel
+
+        # only shown to the user, so the guild snapshot is recent enough
+        guild_snapshot = await fetch_guild_snapshot(guild_id)
+        guild_roles = {str(role_id): role for role_id, role in guild_snapshot.roles.items()}
 
         return ", ".join(
             [
@@ -213,12 +218,9 @@ class Bloxlink(yuyo.AsgiBot):
             list[str]: All the discord IDs linked to this roblox_id.
         """
 
-        cursor = self.mongo.bloxlink["users"].find(
-            {"$or": [{"robloxID": str(roblox_id)}, {"robloxAccounts.accounts": str(roblox_id)}]},
-            {"_id": 1},
-        )
+        from resources.reverse_lookup import reverse_lookup # pylint: disable=import-outside-toplevel
 
-        return [x["_id"] async for x in cursor if str(origin_id) != str(x["_id"])]
+        return await reverse_lookup(roblox_id, origin_id)
 
     @staticmethod
     def command(**command_attrs: "Unpack[NewCommandArgs]"):
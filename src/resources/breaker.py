@@ -0,0 +1,54 @@
+import logging
+from datetime import timedelta
+
+from bloxlink_lib.database import redis
+
+
+__all__ = ("is_breaker_open", "record_forbidden", "reset_breaker")
+
+# Consecutive 403s from Discord before we stop writing to a guild. These count against
+# Discord's invalid request limit, which bans the whole application when exceeded.
+FORBIDDEN_THRESHOLD = 10
+BREAKER_OPEN_DURATION = timedelta(minutes=15)
+
+BREAKER_REASON = "Bloxlink is missing permissions to edit members in this server. Check that the Bloxlink role has Manage Roles and is above the roles it gives."
+
+
+async def is_breaker_open(guild_id: int | str) -> bool:
+    """Check if writes to this guild are paused because Discord kept refusing them."""
+
+    return bool(await redis.exists(f"breaker:{guild_id}:open"))
+
+
+async def record_forbidden(guild_id: int | str) -> bool:
+    """Record a 403 from Discord for this guild. Shared by all nodes.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+
+    Returns:
+        bool: True if this response tripped the breaker.
+    """
+
+    counter_key = f"breaker:{guild_id}:forbidden"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.incr(counter_key)
+        pipeline.expire(counter_key, BREAKER_OPEN_DURATION)
+        forbidden_count, _ = await pipeline.execute()
+
+    if forbidden_count < FORBIDDEN_THRESHOLD:
+        return False
+
+    await redis.set(f"breaker:{guild_id}:open", BREAKER_REASON, expire=BREAKER_OPEN_DURATION)
+    await redis.delete(counter_key)
+
+    logging.warning(f"Permission breaker opened for guild {guild_id} after {forbidden_count} consecutive 403s")
+
+    return True
+
+
+async def reset_breaker(guild_id: int | str):
+    """Reset the consecutive 403 count of a guild after a successful write."""
+
+    await redis.delete(f"breaker:{guild_id}:forbidden")
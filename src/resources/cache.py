@@ -0,0 +1,376 @@
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+from bloxlink_lib.database import redis
+from prometheus_client import Counter, Gauge
+
+from resources.disk_cache import disk_cache
+
+
+__all__ = ("Cache", "warm_disk_caches")
+
+CACHE_REQUESTS = Counter(
+    "bloxlink_cache_requests_total",
+    "Cache lookups by result: hit, stale, l2_hit, disk_hit or miss",
+    ["cache", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "bloxlink_cache_evictions_total",
+    "Entries evicted from the in-process cache to stay within its bounds",
+    ["cache"],
+)
+CACHE_SIZE = Gauge(
+    "bloxlink_cache_entries",
+    "Entries held by the in-process cache",
+    ["cache"],
+)
+
+# Caches that keep their values on disk, warmed by warm_disk_caches() on startup.
+_disk_caches: list["Cache"] = []
+
+# What a negative entry is stored as in Redis and on disk. Loaders return None for "this doesn't exist".
+NEGATIVE_MARKER = "\x00none"
+
+
+def approximate_size(value: Any) -> int:
+    """A cheap estimate of the memory a value uses. Looks one level into containers."""
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "size")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+
+
+class Cache[K, V]:
+    """An in-process LRU cache with a TTL, optionally backed by Redis so that nodes share loaded values.
+
+    Lookups go through get(key, loader). Concurrent misses of one key share a single call of the loader.
+    A loader may return None to say the value doesn't exist, which is cached for `negative_ttl`.
+    Entries that are past their TTL but within `stale_ttl` are returned right away while the loader
+    refreshes them in the background.
+
+    With `use_disk`, values are also kept in the disk cache (when DISK_CACHE_PATH is configured), so that a
+    restarted node starts warm. Only caches with string keys can use it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: timedelta,
+        stale_ttl: timedelta = None,
+        negative_ttl: timedelta = None,
+        max_entries: int = 10_000,
+        max_bytes: int = None,
+        use_redis: bool = False,
+        use_disk: bool = False,
+        encode: Callable[[V], str] = json.dumps,
+        decode: Callable[[str], V] = json.loads,
+        size_of: Callable[[V], int] = approximate_size,
+    ):
+        """
+        Args:
+            name (str): The name of the cache in metrics and Redis keys.
+            ttl (timedelta): How long a loaded value is fresh.
+            stale_ttl (timedelta, optional): How long after the TTL a value may still be served while it is
+                refreshed. Defaults to None, which serves nothing stale.
+            negative_ttl (timedelta, optional): How long "doesn't exist" is cached. Defaults to None, which doesn't
+                cache it.
+            max_entries (int, optional): The most entries held in memory. Defaults to 10,000.
+            max_bytes (int, optional): The most bytes (approximately) held in memory. Defaults to None.
+            use_redis (bool, optional): Share values through Redis, using `encode` and `decode`. Defaults to False.
+            use_disk (bool, optional): Keep values in the disk cache, using `encode` and `decode`. Defaults to False.
+        """
+
+        self.name = name
+        self.ttl = ttl.total_seconds()
+        self.stale_ttl = stale_ttl.total_seconds() if stale_ttl else 0
+        self.negative_ttl = negative_ttl.total_seconds() if negative_ttl else 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.use_redis = use_redis
+        self.use_disk = use_disk and disk_cache is not None
+        self.encode = encode
+        self.decode = decode
+        self.size_of = size_of
+
+        self._entries: OrderedDict[K, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[K, asyncio.Task] = {}
+
+        if self.use_disk:
+            _disk_caches.append(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _redis_key(self, key: K) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def peek(self, key: K, default: Any = None) -> V | None:
+        """Get a fresh value from memory, without loading it."""
+
+        entry = self._entries.get(key)
+
+        if entry is None or entry.expires_at < time.monotonic():
+            return default
+
+        return entry.value
+
+    async def get(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        """Get a value, loading it when it isn't cached.
+
+        Args:
+            key (K): The key of the value.
+            loader (Callable[[], Awaitable[V | None]]): Loads the value. Returns None if it doesn't exist.
+
+        Returns:
+            V | None: The value, or None if it doesn't exist.
+        """
+
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            if entry.expires_at >= now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(cache=self.name, result="hit").inc()
+
+                return entry.value
+
+            if entry.stale_until >= now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(cache=self.name, result="stale").inc()
+                self._load(key, loader)
+
+                return entry.value
+
+        return await asyncio.shield(self._load(key, loader))
+
+    async def _read_disk(self, key: K) -> _Entry | None:
+        """Move an entry from disk into memory."""
+
+        row = await disk_cache.get(self.name, key)
+
+        if row is None:
+            return None
+
+        cached_value, fresh_until, stale_until = row
+        offset = time.monotonic() - time.time()
+
+        try:
+            value = None if cached_value == NEGATIVE_MARKER else self.decode(cached_value)
+        except Exception: # pylint: disable=broad-except
+            # written by an older version whose models no longer match, so it is loaded again
+            logging.debug(f"Failed to decode {key} of cache {self.name} from disk", exc_info=True)
+            await disk_cache.delete(self.name, key)
+            return None
+
+        return self._store(key, value, expires_at=fresh_until + offset, stale_until=stale_until + offset)
+
+    def _load(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> asyncio.Task:
+        """Start loading a key, unless it is being loaded already."""
+
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._run_loader(key, loader))
+            task.add_done_callback(lambda done_task: self._loaded(key, done_task))
+
+        return task
+
+    def _loaded(self, key: K, task: asyncio.Task):
+        self._inflight.pop(key, None)
+
+        # background refreshes have nobody waiting on them, so their errors are logged here
+        if not task.cancelled() and task.exception():
+            logging.debug(f"Failed to load {key} of cache {self.name}: {task.exception()}")
+
+    async def _run_loader(self, key: K, loader: Callable[[], Awaitable[V | None]]) -> V | None:
+        if self.use_redis:
+            cached_value = await redis.get(self._redis_key(key))
+
+            if cached_value is not None:
+                CACHE_REQUESTS.labels(cache=self.name, result="l2_hit").inc()
+
+                cached_value = cached_value.decode() if isinstance(cached_value, bytes) else cached_value
+                value = None if cached_value == NEGATIVE_MARKER else self.decode(cached_value)
+                self._store(key, value)
+
+                return value
+
+        # every value in memory was written to disk as well, so the disk only helps when memory has nothing
+        if self.use_disk and key not in self._entries:
+            entry = await self._read_disk(key)
+
+            if entry is not None and entry.expires_at >= time.monotonic():
+                CACHE_REQUESTS.labels(cache=self.name, result="disk_hit").inc()
+
+                return entry.value
+
+            # a stale entry from disk is now in memory, and is served below if the loader fails
+
+        CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+
+        try:
+            value = await loader()
+        except Exception:
+            stale_entry = self._entries.get(key)
+
+            if stale_entry is not None and stale_entry.stale_until >= time.monotonic():
+                # keep serving the stale value, the next lookup tries again
+                logging.exception(f"Failed to refresh {key} of cache {self.name}")
+                return stale_entry.value
+
+            raise
+
+        await self.set(key, value)
+
+        return value
+
+    async def set(self, key: K, value: V | None):
+        """Cache a value, in memory and in Redis if enabled. None caches that the value doesn't exist."""
+
+        if value is None and not self.negative_ttl:
+            await self.invalidate(key)
+            return
+
+        self._store(key, value)
+
+        if not (self.use_redis or self.use_disk):
+            return
+
+        ttl = self.negative_ttl if value is None else self.ttl
+        encoded_value = NEGATIVE_MARKER if value is None else self.encode(value)
+
+        if self.use_redis:
+            # Redis only holds fresh values, so a value another node loaded can always be used as is
+            await redis.set(self._redis_key(key), encoded_value, expire=timedelta(seconds=ttl))
+
+        if self.use_disk:
+            fresh_until = time.time() + ttl
+            stale_until = fresh_until + (0 if value is None else self.stale_ttl)
+
+            # the value is already in memory, so loads don't wait for SQLite. The writer runs writes in order,
+            # so a later invalidate() still deletes this entry.
+            disk_cache.put(self.name, key, encoded_value, fresh_until, stale_until).add_done_callback(
+                lambda future: self._disk_written(key, future)
+            )
+
+    def _disk_written(self, key: K, future: asyncio.Future):
+        # nobody awaits disk writes, so their errors are logged here
+        if not future.cancelled() and future.exception():
+            logging.warning(f"Failed to write {key} of cache {self.name} to disk: {future.exception()}")
+
+    def _store(self, key: K, value: V | None, *, expires_at: float = None, stale_until: float = None) -> _Entry | None:
+        """Put a value in memory, fresh for the TTL unless `expires_at` and `stale_until` (monotonic) are given."""
+
+        now = time.monotonic()
+
+        if expires_at is None:
+            if value is None:
+                if not self.negative_ttl:
+                    return None
+
+                expires_at = stale_until = now + self.negative_ttl
+            else:
+                expires_at = now + self.ttl
+                stale_until = expires_at + self.stale_ttl
+
+        self.forget(key)
+
+        entry = _Entry(value, expires_at, stale_until, self.size_of(value) if self.max_bytes else 0)
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, evicted_entry = self._entries.popitem(last=False)
+            self._bytes -= evicted_entry.size
+            CACHE_EVICTIONS.labels(cache=self.name).inc()
+
+        CACHE_SIZE.labels(cache=self.name).set(len(self._entries))
+
+        return self._entries.get(key)
+
+    def forget(self, key: K):
+        """Drop a key from the memory of this node only."""
+
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._bytes -= entry.size
+            CACHE_SIZE.labels(cache=self.name).set(len(self._entries))
+
+    async def invalidate(self, key: K):
+        """Drop a key from memory, Redis and disk."""
+
+        self.forget(key)
+
+        if self.use_redis:
+            await redis.delete(self._redis_key(key))
+
+        if self.use_disk:
+            await disk_cache.delete(self.name, key)
+
+    def clear(self):
+        """Drop every key from the memory of this node."""
+
+        self._entries.clear()
+        self._bytes = 0
+        CACHE_SIZE.labels(cache=self.name).set(0)
+
+    async def warm_from_disk(self, limit: int = None) -> int:
+        """Load the most recently written entries on disk into memory. Returns how many were loaded."""
+
+        if not self.use_disk:
+            return 0
+
+        rows = await disk_cache.recent(self.name, min(limit or self.max_entries, self.max_entries))
+        offset = time.monotonic() - time.time()
+        loaded = 0
+
+        # oldest first, so the newest entries end up as the most recently used
+        for key, cached_value, fresh_until, stale_until in reversed(rows):
+            try:
+                value = None if cached_value == NEGATIVE_MARKER else self.decode(cached_value)
+            except Exception: # pylint: disable=broad-except
+                continue
+
+            self._store(key, value, expires_at=fresh_until + offset, stale_until=stale_until + offset)
+            loaded += 1
+
+        return loaded
+
+
+async def warm_disk_caches():
+    """Load every disk-backed cache from disk into memory, so a restarted node doesn't start cold."""
+
+    for cache in _disk_caches:
+        try:
+            loaded = await cache.warm_from_disk()
+        except Exception as ex: # pylint: disable=broad-except
+            logging.exception(f"Failed to warm cache {cache.name} from disk: {ex}")
+        else:
+            logging.info(f"Warmed cache {cache.name} with {loaded} entries from disk")
@@ -9,9 +9,10 @@ from datetime import timedelta
 import hikari
 import humanize
 from bloxlink_lib import BaseModelArbitraryTypes
-from bloxlink_lib.database import redis, fetch_guild_data, update_guild_data
+from bloxlink_lib.database import redis
 from resources.ui.components import parse_custom_id
 from resources.constants import DEVELOPERS
+from resources.guild_data import fetch_guild_data, update_guild_data
 from resources.exceptions import (
     BloxlinkForbidden, CancelCommand, PremiumRequired, UserNotVerified,
     RobloxNotFound, RobloxDown, Message, BindException
@@ -19,6 +20,7 @@ from resources.exceptions import (
 from resources.ui.modals import ModalCustomID
 from resources.premium import get_premium_status
 from resources.response import Prompt, PromptCustomID, PromptPageData, Response
+from resources.unit_of_work import iterate_in_unit_of_work
 from static.whitelist import WHITELISTED_GUILDS
 from config import CONFIG
 
@@ -273,7 +275,8 @@ async def handle_interaction(interaction: hikari.Interaction):
     try:
         returned_already = False # we allow the command to keep executing but we will only return one response to Hikari
 
-        async for command_response in correct_handler(interaction, response=response):
+        # reads made while handling the interaction are memoized until it's done
+        async for command_response in iterate_in_unit_of_work(correct_handler(interaction, response=response)):
             if command_response:
                 if not returned_already:
                     returned_already = True
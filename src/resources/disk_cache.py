@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from config import CONFIG
+
+
+__all__ = ("DiskCache", "disk_cache")
+
+COMPACTION_INTERVAL = timedelta(minutes=10)
+
+# Compaction trims the file to this share of its budget, so it doesn't run again right after the next few writes.
+COMPACTION_TARGET = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    size INTEGER NOT NULL,
+    written_at REAL NOT NULL,
+    PRIMARY KEY (cache, key)
+);
+CREATE INDEX IF NOT EXISTS entries_stale_until ON entries (stale_until);
+CREATE INDEX IF NOT EXISTS entries_written_at ON entries (cache, written_at);
+"""
+
+
+class DiskCache:
+    """A SQLite file on local disk that keeps cached values across restarts, in WAL mode so that reads never wait
+    on writes. Reads and writes each go through their own background thread, so the event loop never waits
+    on the disk.
+
+    Entries carry wall-clock expiry times, since the monotonic clock of the previous process means nothing to the next.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Args:
+            path (str): The path of the database file. Should be on local disk, SQLite doesn't lock over NFS.
+            max_bytes (int): Compaction drops the oldest entries once the values take up more than this.
+        """
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk_cache")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk_cache_read")
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # each connection is only used from the thread of its executor
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA mmap_size = {int(self.max_bytes * 2)}")
+
+        return connection
+
+    def _read(self, sql: str, parameters: tuple, fetch_all: bool) -> asyncio.Future:
+        def _execute():
+            cursor = self._reader.execute(sql, parameters)
+            return cursor.fetchall() if fetch_all else cursor.fetchone()
+
+        return asyncio.get_running_loop().run_in_executor(self._read_executor, _execute)
+
+    async def get(self, cache: str, key: str) -> tuple[str, float, float] | None:
+        """Read an entry that can still be served.
+
+        Returns:
+            tuple[str, float, float] | None: The value, and the wall-clock times until which it is fresh and
+                may be served stale. None when there is no such entry.
+        """
+
+        return await self._read(
+            "SELECT value, fresh_until, stale_until FROM entries WHERE cache = ? AND key = ? AND stale_until > ?",
+            (cache, key, time.time()),
+            fetch_all=False,
+        )
+
+    async def recent(self, cache: str, limit: int) -> list[tuple[str, str, float, float]]:
+        """The most recently written entries of a cache that can still be served, newest first."""
+
+        return await self._read(
+            "SELECT key, value, fresh_until, stale_until FROM entries WHERE cache = ? AND stale_until > ? "
+            "ORDER BY written_at DESC LIMIT ?",
+            (cache, time.time(), limit),
+            fetch_all=True,
+        )
+
+    def _run(self, sql: str, parameters: tuple = ()) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._executor, self._writer.execute, sql, parameters)
+
+    def put(self, cache: str, key: str, value: str, fresh_until: float, stale_until: float) -> asyncio.Future:
+        """Write an entry in the background. Awaiting the returned future waits for the write."""
+
+        # sized in bytes like max_bytes, not in characters
+        return self._run(
+            "INSERT OR REPLACE INTO entries (cache, key, value, fresh_until, stale_until, size, written_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache, key, value, fresh_until, stale_until, len(value.encode()), time.time()),
+        )
+
+    def delete(self, cache: str, key: str) -> asyncio.Future:
+        """Delete an entry in the background. Awaiting the returned future waits for the delete."""
+
+        return self._run("DELETE FROM entries WHERE cache = ? AND key = ?", (cache, key))
+
+    def _compact(self) -> tuple[int, int]:
+        expired = self._writer.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),)).rowcount
+        evicted = 0
+
+        total_size = self._writer.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        if total_size > self.max_bytes:
+            to_free = total_size - self.max_bytes * COMPACTION_TARGET
+            cutoff = None
+
+            for written_at, size in self._writer.execute("SELECT written_at, size FROM entries ORDER BY written_at"):
+                to_free -= size
+                cutoff = written_at
+
+                if to_free <= 0:
+                    break
+
+            evicted = self._writer.execute("DELETE FROM entries WHERE written_at <= ?", (cutoff,)).rowcount
+
+        self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._writer.execute("PRAGMA incremental_vacuum")
+
+        return expired, evicted
+
+    async def run_compaction(self):
+        """Drop expired entries, and the oldest entries while over the size budget, every COMPACTION_INTERVAL."""
+
+        while True:
+            try:
+                expired, evicted = await asyncio.get_running_loop().run_in_executor(self._executor, self._compact)
+                logging.info(f"Compacted the disk cache: {expired} expired and {evicted} evicted entries")
+            except sqlite3.Error as ex:
+                logging.exception(f"Failed to compact the disk cache: {ex}")
+
+            await asyncio.sleep(COMPACTION_INTERVAL.total_seconds())
+
+
+disk_cache: DiskCache | None = (
+    DiskCache(CONFIG.DISK_CACHE_PATH, CONFIG.DISK_CACHE_MAX_MB * 1024 * 1024) if CONFIG.DISK_CACHE_PATH else None
+)
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+import hikari
+from bloxlink_lib import BaseModelArbitraryTypes
+from bloxlink_lib.database import redis
+
+from resources.bloxlink import instance as bloxlink
+
+
+__all__ = ("QueuedDM", "queue_dm", "run_dm_worker")
+
+# Direct messages this node sends per second for all guilds combined. DMs share the bot's global rate limit
+# with role edits, and opening many DM channels quickly is what gets bots flagged for spam.
+DM_PER_SECOND = 5
+
+# Direct messages sent per guild per minute across all nodes. DMs over this limit are dropped, so a raid
+# can't use the bot to message thousands of users.
+DM_GUILD_PER_MINUTE = 60
+
+DM_QUEUE_SIZE = 10_000
+DM_CHANNEL_EXPIRY = timedelta(days=7)
+DM_CLOSED_EXPIRY = timedelta(days=1)
+
+
+class QueuedDM(BaseModelArbitraryTypes):
+    """A direct message waiting to be sent."""
+
+    guild_id: int
+    user_id: int
+    content: str | None = None
+    embed: hikari.Embed | None = None
+    components: list | None = None
+
+
+dm_queue: asyncio.Queue[QueuedDM] = asyncio.Queue(DM_QUEUE_SIZE)
+
+
+async def queue_dm(dm: QueuedDM) -> bool:
+    """Queue a direct message to be sent in the background.
+
+    Returns:
+        bool: False if the message won't be sent, because the user has their DMs closed or the queue is full.
+    """
+
+    if await redis.exists(f"dm_closed:{dm.user_id}"):
+        return False
+
+    try:
+        dm_queue.put_nowait(dm)
+    except asyncio.QueueFull:
+        logging.warning(f"DM queue is full, dropping the DM to {dm.user_id} from {dm.guild_id}")
+        return False
+
+    return True
+
+
+async def _take_guild_budget(guild_id: int) -> bool:
+    window_key = f"dm_rate:{guild_id}:{int(time.time()) // 60}"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.incr(window_key)
+        pipeline.expire(window_key, 120)
+        sent, _ = await pipeline.execute()
+
+    return sent <= DM_GUILD_PER_MINUTE
+
+
+async def _dm_channel_id(user_id: int) -> int:
+    """The ID of the DM channel with a user. Opening a DM channel is a request of its own, so the ID is cached."""
+
+    cache_key = f"dm_channel:{user_id}"
+    channel_id = await redis.get(cache_key)
+
+    if channel_id:
+        return int(channel_id)
+
+    dm_channel = await bloxlink.rest.create_dm_channel(user_id)
+    await redis.set(cache_key, str(dm_channel.id), expire=DM_CHANNEL_EXPIRY)
+
+    return dm_channel.id
+
+
+async def _send_dm(dm: QueuedDM):
+    if not await _take_guild_budget(dm.guild_id):
+        logging.debug(f"Dropping the DM to {dm.user_id}, {dm.guild_id} went over its DM rate limit")
+        return
+
+    async def _deliver():
+        channel_id = await _dm_channel_id(dm.user_id)
+        await bloxlink.rest.create_message(channel_id, content=dm.content, embed=dm.embed, components=dm.components)
+
+    try:
+        try:
+            await _deliver()
+        except hikari.NotFoundError:
+            # the cached channel is gone, so open a new one and try once more
+            await redis.delete(f"dm_channel:{dm.user_id}")
+            await _deliver()
+
+    except (hikari.BadRequestError, hikari.ForbiddenError):
+        # the user has DMs closed, and will until they change their settings
+        await redis.set(f"dm_closed:{dm.user_id}", "1", expire=DM_CLOSED_EXPIRY)
+
+    except hikari.NotFoundError:
+        logging.debug(f"Dropping the DM to {dm.user_id}, no DM channel could be opened with them")
+
+
+async def run_dm_worker():
+    """Send queued direct messages forever, at most DM_PER_SECOND of them. Every node runs one of these."""
+
+    while True:
+        dm = await dm_queue.get()
+        started_at = time.monotonic()
+
+        try:
+            await _send_dm(dm)
+        except Exception as ex: # pylint: disable=broad-except
+            logging.exception(f"Failed to DM {dm.user_id} from {dm.guild_id}: {ex}")
+
+        await asyncio.sleep(max(0.0, 1 / DM_PER_SECOND - (time.monotonic() - started_at)))
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+
+from bloxlink_lib.database import redis
+
+from resources.bloxlink import instance as bloxlink
+from config import CONFIG
+
+from .constants import SKU_TIERS
+
+
+__all__ = (
+    "fetch_synced_discord_billing_tier",
+    "sync_guild_entitlements",
+    "run_entitlement_sync",
+    "SYNC_UNAVAILABLE",
+)
+
+ENTITLEMENT_SYNC_INTERVAL = timedelta(minutes=5)
+ENTITLEMENTS_PAGE_SIZE = 100
+
+# The synced map is trusted until it misses this many syncs in a row, then lookups fall back to REST.
+MAX_MISSED_SYNCS = 3
+
+GUILD_TIERS_KEY = "entitlements:guild_tiers"
+SYNCED_AT_KEY = "entitlements:synced_at"
+LEADER_KEY = "entitlements:sync_leader"
+
+# Returned by fetch_synced_discord_billing_tier() when the map can't be trusted.
+SYNC_UNAVAILABLE = object()
+
+
+async def fetch_synced_discord_billing_tier(guild_id: int | str) -> str | None:
+    """Get the Discord Billing tier of a guild from the last entitlement sync.
+
+    Returns:
+        str | None: The tier, None if the guild has no active entitlement,
+            or SYNC_UNAVAILABLE when the last sync is too old to be trusted.
+    """
+
+    async with redis.pipeline() as pipeline:
+        pipeline.get(SYNCED_AT_KEY)
+        pipeline.hget(GUILD_TIERS_KEY, str(guild_id))
+        synced_at, tier = await pipeline.execute()
+
+    if not synced_at or time.time() - float(synced_at) > ENTITLEMENT_SYNC_INTERVAL.total_seconds() * MAX_MISSED_SYNCS:
+        return SYNC_UNAVAILABLE
+
+    if tier is None:
+        return None
+
+    return tier.decode() if isinstance(tier, bytes) else tier
+
+
+async def sync_guild_entitlements(guild_id: int | str) -> str | None:
+    """Refresh the tier of one guild in the synced map through REST, so a purchase or cancellation
+    shows up before the next full sync.
+
+    Returns:
+        str | None: The tier of the guild's active entitlement, or None if it has none.
+    """
+
+    entitlements = await bloxlink.rest.fetch_entitlements(
+        CONFIG.DISCORD_APPLICATION_ID,
+        guild=str(guild_id),
+        exclude_ended=True,
+    )
+
+    tier = next(
+        (SKU_TIERS[entitlement.sku_id] for entitlement in entitlements if entitlement.sku_id in SKU_TIERS), None
+    )
+
+    if tier:
+        await redis.hset(GUILD_TIERS_KEY, str(guild_id), tier)
+    else:
+        await redis.hdel(GUILD_TIERS_KEY, str(guild_id))
+
+    return tier
+
+
+async def _sync_entitlements():
+    """Page through every active entitlement of the application once and replace the guild -> tier map."""
+
+    guild_tiers: dict[str, str] = {}
+
+    # Discord lists entitlements newest first unless `after` is given, so every page, the first one included,
+    # asks for the entitlements after an ID to page through them oldest first
+    after = 0
+
+    while True:
+        entitlements = await bloxlink.rest.fetch_entitlements(
+            CONFIG.DISCORD_APPLICATION_ID,
+            exclude_ended=True,
+            limit=ENTITLEMENTS_PAGE_SIZE,
+            after=after,
+        )
+
+        for entitlement in entitlements:
+            if entitlement.guild_id and entitlement.sku_id in SKU_TIERS:
+                guild_tiers[str(entitlement.guild_id)] = SKU_TIERS[entitlement.sku_id]
+
+        if len(entitlements) < ENTITLEMENTS_PAGE_SIZE:
+            break
+
+        after = max(entitlement.id for entitlement in entitlements)
+
+    # build the new map next to the old one and swap them, so lookups never see a half-written map
+    staging_key = f"{GUILD_TIERS_KEY}:staging"
+
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.delete(staging_key)
+
+        if guild_tiers:
+            pipeline.hset(staging_key, mapping=guild_tiers)
+            pipeline.rename(staging_key, GUILD_TIERS_KEY)
+        else:
+            pipeline.delete(GUILD_TIERS_KEY)
+
+        pipeline.set(SYNCED_AT_KEY, str(time.time()))
+        await pipeline.execute()
+
+    logging.info(f"Synced Discord entitlements of {len(guild_tiers)} guilds")
+
+
+async def run_entitlement_sync():
+    """Sync entitlements every ENTITLEMENT_SYNC_INTERVAL. Every node runs this, but only the node that
+    claims the interval does the sync."""
+
+    interval = ENTITLEMENT_SYNC_INTERVAL.total_seconds()
+
+    while True:
+        if await redis.set(LEADER_KEY, "1", nx=True, ex=ENTITLEMENT_SYNC_INTERVAL):
+            try:
+                await _sync_entitlements()
+            except Exception as ex: # pylint: disable=broad-except
+                logging.exception(f"Failed to sync entitlements: {ex}")
+
+        # jitter so that nodes started together don't all race for the next interval at once
+        await asyncio.sleep(interval / 10 + random.uniform(0, interval / 10))
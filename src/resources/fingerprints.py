@@ -0,0 +1,99 @@
+import hashlib
+from datetime import timedelta
+
+import hikari
+from bloxlink_lib import MemberSerializable, RobloxUser, GuildBind
+from bloxlink_lib.database import redis
+from pydantic import BaseModel
+
+
+__all__ = ("FingerprintContext", "member_fingerprint", "fetch_fingerprints", "save_fingerprints")
+
+# Binds that depend on what a user owns. We can't see ownership changes without doing the same
+# Roblox lookups the bind API does, so guilds with these binds always get a full scan.
+OWNERSHIP_BIND_TYPES = ("badge", "gamepass", "asset")
+
+# Bounds how long a fingerprint can outlive an input it doesn't cover, such as the Roblox account behind a link.
+FINGERPRINT_EXPIRY = timedelta(days=7)
+
+
+class FingerprintContext:
+    """The guild-wide inputs of a member fingerprint, resolved once per chunk."""
+
+    def __init__(self, guild_binds: list[GuildBind], bind_config_version: int, guild_data: BaseModel):
+        self.bind_config_version = bind_config_version
+        # nickname templates, restrictions and the other settings the bind API reads live in the guild
+        # document, and the dashboard writes them without bumping the bind-config version
+        self.settings_digest = hashlib.blake2b(guild_data.model_dump_json().encode(), digest_size=8).hexdigest()
+        self.group_ids = {int(bind.criteria.id) for bind in guild_binds if bind.type == "group" and bind.criteria.id}
+        self.enabled = not any(bind.type in OWNERSHIP_BIND_TYPES for bind in guild_binds)
+
+
+def member_fingerprint(
+    member: hikari.Member | MemberSerializable, roblox_account: RobloxUser | None, context: FingerprintContext
+) -> str:
+    """Hash everything that decides the outcome of updating a member.
+
+    Args:
+        member (hikari.Member | MemberSerializable): The member to fingerprint.
+        roblox_account (RobloxUser | None): The linked account of the member. Its groups should be synced.
+        context (FingerprintContext): The guild-wide inputs.
+
+    Returns:
+        str: A short hex digest.
+    """
+
+    hasher = hashlib.blake2b(digest_size=8)
+
+    hasher.update(f"v{context.bind_config_version}|{context.settings_digest}|".encode())
+    hasher.update(",".join(sorted(str(role_id) for role_id in member.role_ids or [])).encode())
+    hasher.update(f"|{member.username}|{getattr(member, 'nickname', None)}".encode())
+
+    if roblox_account:
+        hasher.update(f"|{roblox_account.id}|{roblox_account.username}|{roblox_account.display_name}".encode())
+
+        for group_id, group in sorted((roblox_account.groups or {}).items()):
+            if int(group_id) not in context.group_ids:
+                continue
+
+            user_roleset = getattr(group, "user_roleset", None)
+            hasher.update(f"|{group_id}:{user_roleset.rank if user_roleset else None}".encode())
+
+    return hasher.hexdigest()
+
+
+async def fetch_fingerprints(guild_id: int | str, member_ids: list[int]) -> dict[int, str]:
+    """Get the fingerprints saved for the given members, in one round trip.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+        member_ids (list[int]): The members to look up.
+
+    Returns:
+        dict[int, str]: The fingerprints of the members that have one.
+    """
+
+    if not member_ids:
+        return {}
+
+    fingerprints = await redis.hmget(f"fingerprints:{guild_id}", [str(member_id) for member_id in member_ids])
+
+    return {
+        int(member_id): fingerprint.decode() if isinstance(fingerprint, bytes) else fingerprint
+        for member_id, fingerprint in zip(member_ids, fingerprints)
+        if fingerprint
+    }
+
+
+async def save_fingerprints(guild_id: int | str, fingerprints: dict[int, str]):
+    """Save the fingerprints of members after they were updated."""
+
+    if not fingerprints:
+        return
+
+    fingerprints_key = f"fingerprints:{guild_id}"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.hset(fingerprints_key, mapping={str(member_id): fingerprint for member_id, fingerprint in fingerprints.items()})
+        pipeline.expire(fingerprints_key, FINGERPRINT_EXPIRY)
+        await pipeline.execute()
@@ -0,0 +1,88 @@
+import itertools
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from bloxlink_lib.database import fetch_guild_data as fetch_guild_data_uncached
+from bloxlink_lib.database import update_guild_data as update_guild_data_uncached
+
+from resources.cache import Cache
+from resources.redis import listen, publish
+
+
+__all__ = ("fetch_guild_data", "update_guild_data", "invalidate_guild_data")
+
+# Published with {"guild_id": ...} after guild data is written. Every node drops its copies of the
+# guild. Services that write guild documents directly (such as the dashboard) should publish here as well.
+GUILD_DATA_CHANNEL = "GUILD_DATA_INVALIDATE"
+
+# Writes that aren't published are picked up after this.
+GUILD_DATA_TTL = timedelta(minutes=2)
+
+guild_data_cache = Cache("guild_data", ttl=GUILD_DATA_TTL, max_entries=20_000)
+
+# The version of each guild this node heard was written recently, oldest write first. Cache keys contain the
+# version, so bumping it orphans every copy of the guild, including reads that were in flight during the write.
+# Orphans age out of the LRU. Versions come from one counter, so they are never reused, and a guild is forgotten
+# once its last write is older than the TTL, since every copy from before that write has expired by then.
+_guild_versions: OrderedDict[str, tuple[int, float]] = OrderedDict()
+_version_counter = itertools.count(1)
+
+
+def _bump_version(guild_id: str):
+    now = time.monotonic()
+
+    _guild_versions[guild_id] = (next(_version_counter), now)
+    _guild_versions.move_to_end(guild_id)
+
+    while _guild_versions:
+        oldest_guild_id, (_, written_at) = next(iter(_guild_versions.items()))
+
+        if now - written_at <= GUILD_DATA_TTL.total_seconds():
+            break
+
+        del _guild_versions[oldest_guild_id]
+
+
+def _guild_version(guild_id: str) -> int:
+    version, _ = _guild_versions.get(guild_id, (0, 0))
+
+    return version
+
+
+async def fetch_guild_data(guild_id: int | str, *fields: str):
+    """fetch_guild_data() of bloxlink_lib, cached per guild and set of fields.
+    The returned object is shared with other callers, so it must not be modified.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+        *fields (str): The fields to fetch. Fetches the whole document when none are given.
+
+    Returns:
+        The guild data, with the requested fields.
+    """
+
+    guild_id = str(guild_id)
+    key = f"{guild_id}:{_guild_version(guild_id)}:{','.join(sorted(fields)) or '*'}"
+
+    return await guild_data_cache.get(key, lambda: fetch_guild_data_uncached(guild_id, *fields))
+
+
+async def invalidate_guild_data(guild_id: int | str):
+    """Drop the cached data of a guild on every node. Called after every write."""
+
+    guild_id = str(guild_id)
+
+    _bump_version(guild_id)
+
+    await publish(GUILD_DATA_CHANNEL, {"guild_id": guild_id})
+
+
+async def update_guild_data(guild_id: int | str, **aspects):
+    """update_guild_data() of bloxlink_lib, which also drops the cached data of the guild on every node."""
+
+    await update_guild_data_uncached(guild_id, **aspects)
+    await invalidate_guild_data(guild_id)
+
+
+listen(GUILD_DATA_CHANNEL, lambda message: _bump_version(str(message["guild_id"])))
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from typing import Mapping
+
+import hikari
+from bloxlink_lib import BaseModelArbitraryTypes
+
+from resources.bloxlink import instance as bloxlink
+from resources.cache import Cache
+from resources.redis import listen, publish
+from config import CONFIG
+
+
+__all__ = ("GuildSnapshot", "fetch_guild_snapshot", "invalidate_guild_snapshot")
+
+# Published with {"guild_id": ...} when the roles or settings of a guild change, by us when we create or delete
+# roles and by the gateway on role and guild update events. Every node drops its snapshot of the guild.
+GUILD_SNAPSHOT_CHANNEL = "GUILD_SNAPSHOT_INVALIDATE"
+
+# Role edits we don't hear about (for example reordering roles while the gateway is down) are picked up after this.
+GUILD_SNAPSHOT_TTL = timedelta(minutes=5)
+
+
+class GuildSnapshot(BaseModelArbitraryTypes):
+    """What member updates need to know about a guild, fetched once and shared by every update of the guild."""
+
+    guild: hikari.RESTGuild
+    bot_top_role_position: int | None = None # None when the bot's member couldn't be fetched
+
+    @property
+    def id(self) -> hikari.Snowflake:
+        return self.guild.id
+
+    @property
+    def name(self) -> str:
+        return self.guild.name
+
+    @property
+    def owner_id(self) -> hikari.Snowflake:
+        return self.guild.owner_id
+
+    @property
+    def roles(self) -> Mapping[hikari.Snowflake, hikari.Role]:
+        return self.guild.roles
+
+
+guild_snapshots: Cache[int, GuildSnapshot] = Cache("guild_snapshot", ttl=GUILD_SNAPSHOT_TTL, max_entries=5_000)
+
+
+async def _load_guild_snapshot(guild_id: int) -> GuildSnapshot:
+    guild = await bloxlink.rest.fetch_guild(guild_id)
+
+    try:
+        bot_member = await bloxlink.rest.fetch_member(guild_id, CONFIG.DISCORD_APPLICATION_ID)
+    except hikari.NotFoundError:
+        bot_top_role_position = None
+    else:
+        bot_top_role_position = max(
+            (guild.roles[role_id].position for role_id in bot_member.role_ids if role_id in guild.roles),
+            default=0,
+        )
+
+    return GuildSnapshot(guild=guild, bot_top_role_position=bot_top_role_position)
+
+
+async def fetch_guild_snapshot(guild_id: int | str, *, fresh: bool = False) -> GuildSnapshot:
+    """Get the snapshot of a guild, from the cache when possible.
+
+    Args:
+        guild_id (int | str): The ID of the guild.
+        fresh (bool, optional): Fetch the guild over REST and replace the cached snapshot with it. Used by
+            commands that act on the roles right away, since role changes made in Discord only reach the
+            cache when the gateway publishes them. Defaults to False.
+
+    Returns:
+        GuildSnapshot: The roles, owner, name and the bot's highest role position of the guild.
+    """
+
+    guild_id = int(guild_id)
+
+    if fresh:
+        guild_snapshot = await _load_guild_snapshot(guild_id)
+        await guild_snapshots.set(guild_id, guild_snapshot)
+
+        return guild_snapshot
+
+    return await guild_snapshots.get(guild_id, lambda: _load_guild_snapshot(guild_id))
+
+
+async def invalidate_guild_snapshot(guild_id: int | str):
+    """Drop the snapshot of a guild on every node. Call this after creating, editing or deleting roles."""
+
+    guild_snapshots.forget(int(guild_id))
+
+    await publish(GUILD_SNAPSHOT_CHANNEL, {"guild_id": str(guild_id)})
+
+
+listen(GUILD_SNAPSHOT_CHANNEL, lambda message: guild_snapshots.forget(int(message["guild_id"])))
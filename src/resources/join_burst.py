@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import timedelta
+
+from bloxlink_lib import MemberSerializable
+from bloxlink_lib.database import redis
+
+
+__all__ = (
+    "record_join",
+    "queue_join",
+    "take_queued_joins",
+    "claim_join_flusher",
+    "renew_join_flusher",
+    "keep_join_flusher",
+    "release_join_flusher",
+    "has_queued_joins",
+)
+
+# A guild with more joins than this within one window is in a burst. Its joins are then queued
+# and updated in batches through the chunk pipeline instead of one request at a time.
+JOIN_BURST_WINDOW = 10 # seconds
+JOIN_BURST_THRESHOLD = 20
+
+# Queued joins are collected for this long before a batch is taken, so repeated joins of a user collapse.
+JOIN_BATCH_DELAY = 2 # seconds
+JOIN_BATCH_SIZE = 100
+
+# How long a node may hold the flusher claim of a guild without renewing it, in case the node dies.
+JOIN_FLUSHER_EXPIRY = timedelta(seconds=60)
+JOIN_FLUSHER_RENEW_INTERVAL = JOIN_FLUSHER_EXPIRY / 3
+QUEUED_JOINS_EXPIRY = timedelta(minutes=30)
+
+
+async def record_join(guild_id: int | str) -> bool:
+    """Count a join of this guild. Shared by all nodes.
+
+    Returns:
+        bool: True if the guild is in a join burst.
+    """
+
+    window_key = f"joins:{guild_id}:rate:{int(time.time()) // JOIN_BURST_WINDOW}"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.incr(window_key)
+        pipeline.expire(window_key, JOIN_BURST_WINDOW * 2)
+        join_count, _ = await pipeline.execute()
+
+    return join_count > JOIN_BURST_THRESHOLD
+
+
+async def queue_join(guild_id: int | str, member: MemberSerializable) -> bool:
+    """Queue a joining member to be updated with the next batch of the guild.
+    A member who joins again before the batch is taken is only queued once.
+
+    Returns:
+        bool: True if the member was not queued already.
+    """
+
+    queue_key = f"joins:{guild_id}:queued"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.hset(queue_key, str(member.id), member.model_dump_json())
+        pipeline.expire(queue_key, QUEUED_JOINS_EXPIRY)
+        added, _ = await pipeline.execute()
+
+    return bool(added)
+
+
+async def take_queued_joins(guild_id: int | str) -> list[MemberSerializable]:
+    """Take every queued member of the guild, so they are not taken twice."""
+
+    queue_key = f"joins:{guild_id}:queued"
+
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.hgetall(queue_key)
+        pipeline.delete(queue_key)
+        queued_members, _ = await pipeline.execute()
+
+    return [MemberSerializable.model_validate_json(member_data) for member_data in queued_members.values()]
+
+
+async def has_queued_joins(guild_id: int | str) -> bool:
+    """Check if members of the guild are waiting for a batch."""
+
+    return bool(await redis.hlen(f"joins:{guild_id}:queued"))
+
+
+async def claim_join_flusher(guild_id: int | str) -> bool:
+    """Try to become the node that updates the queued joins of the guild.
+
+    Returns:
+        bool: True if this node should flush the guild's joins.
+    """
+
+    return bool(await redis.set(f"joins:{guild_id}:flusher", "1", nx=True, ex=JOIN_FLUSHER_EXPIRY))
+
+
+async def renew_join_flusher(guild_id: int | str):
+    """Keep the flusher claim of the guild while its batches are still being updated."""
+
+    await redis.expire(f"joins:{guild_id}:flusher", JOIN_FLUSHER_EXPIRY)
+
+
+@contextlib.asynccontextmanager
+async def keep_join_flusher(guild_id: int | str):
+    """Renew the flusher claim of the guild in the background while the block runs,
+    so a batch that waits long on the scheduler doesn't let another node start flushing too."""
+
+    async def _renew():
+        while True:
+            await asyncio.sleep(JOIN_FLUSHER_RENEW_INTERVAL.total_seconds())
+
+            try:
+                await renew_join_flusher(guild_id)
+            except Exception as ex: # pylint: disable=broad-except
+                logging.warning(f"Failed to renew the join flusher claim of {guild_id}: {ex}")
+
+    renew_task = asyncio.create_task(_renew())
+
+    try:
+        yield
+    finally:
+        renew_task.cancel()
+
+
+async def release_join_flusher(guild_id: int | str):
+    """Let another node flush the guild's joins."""
+
+    await redis.delete(f"joins:{guild_id}:flusher")
@@ -0,0 +1,158 @@
+import asyncio
+import contextlib
+import logging
+import math
+
+from bloxlink_lib import BaseModel
+from bloxlink_lib.database import redis
+
+from resources.retry_queue import RETRY_QUEUE_KEY
+from resources.scheduler import NODE_MEMBERS_PER_SECOND, scheduler
+
+
+__all__ = ("LoadMonitor", "LoadReport", "Overload", "load_monitor")
+
+# A node is saturated when any of these is reached.
+MAX_INFLIGHT_CHUNKS = 8
+MAX_LOOP_LAG = 0.5 # seconds
+
+# Chunks, joins, join-burst batches and retries each wait for one scheduler slot at a time, so the queue is
+# only as deep as the work in flight. Chunks are capped by MAX_INFLIGHT_CHUNKS on their own, so this is reached
+# when joins pile up, at which point a new waiter is more than two seconds away from its slot.
+MAX_QUEUE_DEPTH = MAX_INFLIGHT_CHUNKS + NODE_MEMBERS_PER_SECOND * 2
+
+# The retry queue is shared by every node. When it is this deep, Roblox or the bind API is struggling
+# and new work would only pile onto it, so every node turns chunks away.
+MAX_RETRY_QUEUE_DEPTH = 50_000
+
+LOOP_LAG_INTERVAL = 0.5
+RETRY_QUEUE_REFRESH_INTERVAL = 5
+DEFAULT_RETRY_AFTER = 5
+UPSTREAM_RETRY_AFTER = 60
+
+
+class LoadReport(BaseModel):
+    """The load of this node, as reported to the gateway."""
+
+    inflight_chunks: int
+    inflight_work: int # chunks, joins, join-burst batches and retries
+    loop_lag_ms: float
+    queue_depth: int
+    retry_queue_depth: int
+    score: float # 1.0 or more means saturated; the gateway should prefer the node with the lowest score
+    saturated: bool
+
+
+class Overload(BaseModel):
+    """Why this node turned work away, and when to try again."""
+
+    status: int
+    retry_after: int
+    reason: str
+
+
+class LoadMonitor:
+    """Tracks in-flight work, event loop lag and queue depth to decide if this node takes more work."""
+
+    def __init__(self):
+        self.inflight: dict[str, int] = {}
+        self.loop_lag = 0.0
+        self.retry_queue_depth = 0
+        self._task: asyncio.Task = None
+
+    def start(self):
+        """Start measuring the event loop lag. Must be called from the running loop."""
+
+        if not self._task or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._measure())
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        last_refresh = 0.0
+
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - started_at - LOOP_LAG_INTERVAL)
+
+            # react to lag right away, but let it settle slowly so one quiet tick doesn't reopen the floodgates
+            self.loop_lag = lag if lag > self.loop_lag else self.loop_lag * 0.8 + lag * 0.2
+
+            if loop.time() - last_refresh >= RETRY_QUEUE_REFRESH_INTERVAL:
+                last_refresh = loop.time()
+
+                try:
+                    self.retry_queue_depth = await redis.zcard(RETRY_QUEUE_KEY)
+                except Exception as ex: # pylint: disable=broad-except
+                    logging.warning(f"Failed to read the retry queue depth: {ex}")
+
+    @property
+    def inflight_chunks(self) -> int:
+        """The amount of chunks being processed."""
+
+        return self.inflight.get("chunk", 0)
+
+    @contextlib.contextmanager
+    def track(self, kind: str):
+        """Count work that uses the scheduler as in-flight while the block runs.
+
+        Args:
+            kind (str): What the work is: "chunk", "join", "join_batch" or "retry".
+        """
+
+        self.inflight[kind] = self.inflight.get(kind, 0) + 1
+
+        try:
+            yield
+        finally:
+            self.inflight[kind] -= 1
+
+    def report(self) -> LoadReport:
+        """The current load of this node."""
+
+        queue_depth = scheduler.queue_depth()
+        score = max(
+            self.inflight_chunks / MAX_INFLIGHT_CHUNKS,
+            self.loop_lag / MAX_LOOP_LAG,
+            queue_depth / MAX_QUEUE_DEPTH,
+        )
+
+        return LoadReport(
+            inflight_chunks=self.inflight_chunks,
+            inflight_work=sum(self.inflight.values()),
+            loop_lag_ms=round(self.loop_lag * 1000, 1),
+            queue_depth=queue_depth,
+            retry_queue_depth=self.retry_queue_depth,
+            score=round(score, 3),
+            saturated=score >= 1 or self.retry_queue_depth >= MAX_RETRY_QUEUE_DEPTH,
+        )
+
+    def overload(self) -> Overload | None:
+        """Check if new work should be turned away.
+
+        Returns:
+            Overload | None: A 503 when the shared upstream backlog is too deep, a 429 when this node
+                is saturated (another node may have room), or None when the work can be accepted.
+        """
+
+        if self.retry_queue_depth >= MAX_RETRY_QUEUE_DEPTH:
+            return Overload(status=503, retry_after=UPSTREAM_RETRY_AFTER, reason="The upstream retry backlog is full.")
+
+        if self.inflight_chunks >= MAX_INFLIGHT_CHUNKS:
+            return Overload(status=429, retry_after=DEFAULT_RETRY_AFTER, reason="Too many chunks in flight on this node.")
+
+        if self.loop_lag >= MAX_LOOP_LAG:
+            return Overload(status=429, retry_after=DEFAULT_RETRY_AFTER, reason="This node's event loop is lagging.")
+
+        queue_depth = scheduler.queue_depth()
+
+        if queue_depth >= MAX_QUEUE_DEPTH:
+            # about the time it takes the scheduler to drain the queue back under the limit
+            retry_after = math.ceil((queue_depth - MAX_QUEUE_DEPTH) / NODE_MEMBERS_PER_SECOND) + DEFAULT_RETRY_AFTER
+
+            return Overload(status=429, retry_after=retry_after, reason="Too many member updates queued on this node.")
+
+        return None
+
+
+load_monitor = LoadMonitor()
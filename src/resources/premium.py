@@ -3,14 +3,46 @@ from typing import Literal
 from datetime import timedelta
 import hikari
 from bloxlink_lib import BaseModel
-from bloxlink_lib.database import fetch_guild_data, redis
 from resources.bloxlink import instance as bloxlink
+from resources.cache import Cache
+from resources.entitlements import (
+    SYNC_UNAVAILABLE,
+    fetch_synced_discord_billing_tier,
+    sync_guild_entitlements,
+)
+from resources.guild_data import GUILD_DATA_CHANNEL, fetch_guild_data
+from resources.redis import listen, publish
 from config import CONFIG
 
 from .constants import SKU_TIERS
 
 
-__all__ = ("PremiumStatus", "get_premium_status")
+__all__ = ("PremiumStatus", "get_premium_status", "invalidate_premium_status")
+
+# Published with {"guild_id": ...} when the premium of a guild changes outside of its guild document,
+# such as Discord entitlement events. Every node drops its cached status of the guild.
+PREMIUM_CHANNEL = "PREMIUM_INVALIDATE"
+
+MISSING = object()
+
+# The premium status of each guild. Guilds without premium are cached as None, for a shorter time,
+# so a purchase shows up quickly even when nobody invalidates the cache.
+premium_status_cache: Cache[str, "PremiumStatus"] = Cache(
+    "premium_status",
+    ttl=timedelta(minutes=5),
+    negative_ttl=timedelta(seconds=60),
+    max_entries=50_000,
+)
+
+# The Discord Billing tier of each guild, shared by all nodes. Guilds without an entitlement are cached as None.
+discord_billing_cache: Cache[str, str] = Cache(
+    "premium:discord_billing",
+    ttl=timedelta(seconds=100),
+    negative_ttl=timedelta(seconds=100),
+    use_redis=True,
+    encode=str,
+    decode=str,
+)
 
 
 class PremiumStatus(BaseModel):
@@ -88,79 +120,152 @@ def get_merged_features(premium_data, tier) -> set[str]:
     return features
 
 
+async def fetch_discord_billing_tier(guild_id: int | str) -> str | None:
+    """Get the tier of the guild's active Discord Billing entitlement from the last entitlement sync,
+    or through REST if the sync is behind."""
+
+    synced_tier = await fetch_synced_discord_billing_tier(guild_id)
+
+    if synced_tier is not SYNC_UNAVAILABLE:
+        return synced_tier
+
+    entitlements = await bloxlink.rest.fetch_entitlements(
+        CONFIG.DISCORD_APPLICATION_ID,
+        guild=str(guild_id),
+        exclude_ended=True
+    )
+
+    return SKU_TIERS[entitlements[0].sku_id] if entitlements else None
+
+
+def premium_status_from_tier(guild_id: int | str, premium_data: dict, discord_billing_tier: str | None) -> PremiumStatus:
+    """Build the premium status of a guild from its Discord Billing tier and its premium data in the database."""
+
+    if discord_billing_tier:
+        tier, term = get_user_facing_tier(discord_billing_tier)
+        features = get_merged_features(premium_data, discord_billing_tier)
+
+        return PremiumStatus(
+            active=True,
+            type="guild",
+            payment_source="Discord Billing",
+            guild_id=guild_id,
+            tier=tier,
+            term=term,
+            features=features,
+        )
+
+    # hit database for premium
+    if premium_data and premium_data.get("active") and not premium_data.get("externalDiscord"):
+        tier, term = get_user_facing_tier(premium_data["type"])
+        features = get_merged_features(premium_data, premium_data.get("type", "basic/month"))
+
+        return PremiumStatus(
+            active=True,
+            type="guild",
+            payment_source="Bloxlink Dashboard",
+            guild_id=guild_id,
+            tier=tier,
+            term=term,
+            features=features,
+        )
+
+    return PremiumStatus(active=False)
+
+
+async def _load_premium_status(guild_id: str, discord_billing_tier: str | None = MISSING) -> PremiumStatus | None:
+    """Load the premium status of a guild. Returns None for guilds without premium, so they are negatively cached."""
+
+    premium_data = (await fetch_guild_data(guild_id, "premium")).premium
+
+    if discord_billing_tier is MISSING:
+        # check discord through REST
+        discord_billing_tier = await discord_billing_cache.get(guild_id, lambda: fetch_discord_billing_tier(guild_id))
+
+    premium_status = premium_status_from_tier(guild_id, premium_data, discord_billing_tier)
+
+    return premium_status if premium_status.active else None
+
+
+def interaction_discord_billing_tier(interaction: hikari.PartialInteraction) -> str | None:
+    """The Discord Billing tier of the guild an interaction came from. Interactions carry the active entitlements."""
+
+    for entitlement in interaction.entitlements:
+        if entitlement.sku_id in SKU_TIERS:
+            return SKU_TIERS[entitlement.sku_id]
+
+    return None
+
+
 async def get_premium_status(
     *, guild_id: int | str = None, _user_id: int | str = None, interaction: hikari.CommandInteraction=None
 ) -> PremiumStatus:
-    """Returns a PremiumStatus object dictating whether the guild has premium."""
-
-    if guild_id:
-        premium_data = (await fetch_guild_data(str(guild_id), "premium")).premium
-
-        if interaction:
-            for entitlement in interaction.entitlements:
-                if entitlement.sku_id in SKU_TIERS:
-                    tier, term = get_user_facing_tier(SKU_TIERS[entitlement.sku_id])
-                    features = get_merged_features(premium_data, SKU_TIERS[entitlement.sku_id])
-
-                    return PremiumStatus(
-                        active=True,
-                        type="guild",
-                        payment_source="Discord Billing",
-                        payment_source_url="https://support.discord.com/hc/en-us/articles/9359445233303-Premium-App-Subscriptions-FAQ",
-                        guild_id=guild_id,
-                        tier=tier,
-                        term=term,
-                        features=features,
-                    )
-        else:
-            # check discord through REST
-            redis_discord_billing_premium_key = f"premium:discord_billing:{guild_id}"
-            redis_discord_billing_tier: bytes = await redis.get(redis_discord_billing_premium_key)
-            has_discord_billing = redis_discord_billing_tier not in (None, "false")
-
-            if not redis_discord_billing_tier:
-                entitlements = await bloxlink.rest.fetch_entitlements(
-                    CONFIG.DISCORD_APPLICATION_ID,
-                    guild=str(guild_id),
-                    exclude_ended=True
-                )
+    """Returns a PremiumStatus object dictating whether the guild has premium.
 
-                has_discord_billing = bool(entitlements)
-                redis_discord_billing_tier = SKU_TIERS[entitlements[0].sku_id] if has_discord_billing else None
+    Statuses are cached per guild. Interactions carry the guild's entitlements, so they refresh the cache
+    whenever they disagree with it.
+    """
 
-                await redis.set(redis_discord_billing_premium_key, redis_discord_billing_tier if has_discord_billing else "false", expire=timedelta(seconds=100))
+    if not guild_id:
+        # user premium
+        raise NotImplementedError()
 
-            if has_discord_billing:
-                tier, term = get_user_facing_tier(redis_discord_billing_tier)
-                features = get_merged_features(premium_data, redis_discord_billing_tier)
+    guild_id = str(guild_id)
 
-                return PremiumStatus(
-                    active=True,
-                    type="guild",
-                    payment_source="Discord Billing",
-                    guild_id=guild_id,
-                    tier=tier,
-                    term=term,
-                    features=features,
-                )
+    if interaction:
+        discord_billing_tier = interaction_discord_billing_tier(interaction)
+        cached_status = premium_status_cache.peek(guild_id, MISSING)
+
+        if cached_status is not MISSING and _matches_discord_billing(cached_status, discord_billing_tier):
+            return cached_status or PremiumStatus(active=False)
+
+        premium_status = await _load_premium_status(guild_id, discord_billing_tier)
 
-        # hit database for premium
-        if premium_data and premium_data.get("active") and not premium_data.get("externalDiscord"):
-            tier, term = get_user_facing_tier(premium_data["type"])
-            features = get_merged_features(premium_data, premium_data.get("type", "basic/month"))
-
-            return PremiumStatus(
-                active=True,
-                type="guild",
-                payment_source="Bloxlink Dashboard",
-                guild_id=guild_id,
-                tier=tier,
-                term=term,
-                features=features,
-            )
+        await premium_status_cache.set(guild_id, premium_status)
+        await discord_billing_cache.set(guild_id, discord_billing_tier)
 
     else:
-        # user premium
-        raise NotImplementedError()
+        premium_status = await premium_status_cache.get(guild_id, lambda: _load_premium_status(guild_id))
 
-    return PremiumStatus(active=False)
+    return premium_status or PremiumStatus(active=False)
+
+
+def _matches_discord_billing(premium_status: PremiumStatus | None, discord_billing_tier: str | None) -> bool:
+    """Check if a cached status agrees with the entitlements of an interaction."""
+
+    has_discord_billing = bool(premium_status and premium_status.payment_source == "Discord Billing")
+
+    if not discord_billing_tier:
+        return not has_discord_billing
+
+    tier, term = get_user_facing_tier(discord_billing_tier)
+
+    return has_discord_billing and premium_status.tier == tier and premium_status.term == term
+
+
+async def invalidate_premium_status(guild_id: int | str):
+    """Drop the cached premium status of a guild on every node, for example after a purchase or cancellation.
+    The guild's tier in the synced entitlement map is refreshed first, so the status isn't loaded again from
+    the map as it was before the change."""
+
+    guild_id = str(guild_id)
+
+    try:
+        await sync_guild_entitlements(guild_id)
+    finally:
+        premium_status_cache.forget(guild_id)
+        await discord_billing_cache.invalidate(guild_id)
+
+        await publish(PREMIUM_CHANNEL, {"guild_id": guild_id})
+
+
+def _forget_premium_status(message: dict):
+    guild_id = str(message["guild_id"])
+
+    premium_status_cache.forget(guild_id)
+    discord_billing_cache.forget(guild_id)
+
+
+# premium data lives in the guild document, so writes to it also change the premium status
+listen(PREMIUM_CHANNEL, _forget_premium_status)
+listen(GUILD_DATA_CHANNEL, _forget_premium_status)
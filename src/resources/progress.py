@@ -0,0 +1,190 @@
+import json
+from datetime import datetime, timedelta
+
+import hikari
+from bloxlink_lib import BaseModel, parse_into
+from bloxlink_lib.database import redis
+
+from resources.ui.progress_bar import ProgressBar
+
+
+__all__ = (
+    "VerifyAllProgress",
+    "ProgressStats",
+    "fetch_progress",
+    "fetch_progress_stats",
+    "increment_progress_stats",
+    "halt_progress",
+    "is_cancelled",
+    "build_progress_embed",
+)
+
+PROGRESS_STATS_EXPIRY = timedelta(days=2)
+
+
+class VerifyAllProgress(BaseModel):
+    """Progress of the verifyall scan"""
+
+    started_at: datetime
+    ended_at: datetime | None = None
+    members_processed: int
+    total_members: int
+    current_chunk: int
+    total_chunks: int
+
+
+class ProgressStats(BaseModel):
+    """Counters that the HTTP nodes add to a verifyall scan, next to the progress written by the gateway."""
+
+    updated: int = 0
+    skipped: int = 0
+    retried: int = 0
+    gave_up: int = 0
+    halted_reason: str | None = None
+
+    @property
+    def skip_ratio(self) -> float:
+        """The ratio of members that were skipped because nothing changed since the last scan."""
+
+        seen = self.updated + self.skipped
+
+        return self.skipped / seen if seen else 0.0
+
+
+async def fetch_progress(nonce: str) -> VerifyAllProgress | None:
+    """Get the progress of a verifyall scan. The progress itself is written by the gateway.
+
+    Args:
+        nonce (str): The nonce of the scan.
+
+    Returns:
+        VerifyAllProgress | None: The progress of the scan, or None if it has expired.
+    """
+
+    progress_data = await redis.get(f"progress:{nonce}")
+
+    if not progress_data:
+        return None
+
+    return parse_into(json.loads(progress_data), VerifyAllProgress)
+
+
+async def fetch_progress_stats(nonce: str) -> ProgressStats:
+    """Get the counters that the HTTP nodes recorded for a verifyall scan."""
+
+    stats_data: dict = await redis.hgetall(f"progress:{nonce}:stats")
+
+    return ProgressStats(**{
+        (field.decode() if isinstance(field, bytes) else field): (value.decode() if isinstance(value, bytes) else value)
+        for field, value in stats_data.items()
+    })
+
+
+async def increment_progress_stats(nonce: str, **counts: int):
+    """Add to the counters of a verifyall scan. Every node processing chunks of the scan contributes to these.
+
+    Args:
+        nonce (str): The nonce of the scan.
+        **counts (int): The fields of ProgressStats to increment.
+    """
+
+    counts = {field: count for field, count in counts.items() if count}
+
+    if not counts:
+        return
+
+    stats_key = f"progress:{nonce}:stats"
+
+    async with redis.pipeline() as pipeline:
+        for field, count in counts.items():
+            pipeline.hincrby(stats_key, field, count)
+
+        pipeline.expire(stats_key, PROGRESS_STATS_EXPIRY)
+        await pipeline.execute()
+
+
+async def halt_progress(nonce: str, reason: str):
+    """Stop a verifyall scan on every node and record why it was stopped.
+
+    Args:
+        nonce (str): The nonce of the scan.
+        reason (str): The reason shown to the user.
+    """
+
+    stats_key = f"progress:{nonce}:stats"
+
+    async with redis.pipeline() as pipeline:
+        pipeline.hset(stats_key, "halted_reason", reason)
+        pipeline.expire(stats_key, PROGRESS_STATS_EXPIRY)
+        await pipeline.execute()
+
+    await redis.set(f"progress:{nonce}:cancelled", "1", expire=PROGRESS_STATS_EXPIRY)
+
+
+async def is_cancelled(nonce: str) -> bool:
+    """Check if a verifyall scan was cancelled."""
+
+    return bool(await redis.get(f"progress:{nonce}:cancelled"))
+
+
+def build_progress_embed(
+    progress: VerifyAllProgress,
+    stats: ProgressStats = None,
+    *,
+    cancelled_at: datetime = None,
+    footer: str = None,
+) -> hikari.Embed:
+    """Build the embed that shows the progress of a verifyall scan.
+
+    Args:
+        progress (VerifyAllProgress): The progress to show.
+        stats (ProgressStats, optional): The counters recorded by the HTTP nodes. Defaults to None.
+        cancelled_at (datetime, optional): When the scan was cancelled, if it was. Defaults to None.
+        footer (str, optional): The footer text of the embed. Defaults to None.
+
+    Returns:
+        hikari.Embed: The progress embed.
+    """
+
+    ended_at = cancelled_at or progress.ended_at
+
+    fields = [
+        f"Started: <t:{int(progress.started_at.timestamp())}:R>",
+        f"Members processed: {progress.members_processed}/{progress.total_members}",
+        f"Chunks processed: {progress.current_chunk}/{progress.total_chunks}",
+        "Progress: " + str(ProgressBar(progress=progress.current_chunk, total=progress.total_chunks))
+    ]
+
+    if ended_at:
+        fields.insert(1, f"Ended: <t:{int(ended_at.timestamp())}:R>")
+
+    if stats and stats.skipped:
+        fields.append(f"Skipped (unchanged since last scan): {stats.skipped} ({stats.skip_ratio:.0%})")
+
+    if stats and stats.retried:
+        fields.append(f"Retried after Roblox errors: {stats.retried}")
+
+    if stats and stats.gave_up:
+        fields.append(f"Could not be updated: {stats.gave_up}")
+
+    if stats and stats.halted_reason:
+        fields.append(f"Stopped early: {stats.halted_reason}")
+
+    if stats and stats.halted_reason:
+        title = "Scan Stopped"
+    elif cancelled_at:
+        title = "Scan Complete (Cancelled)"
+    elif progress.ended_at:
+        title = "Scan Complete"
+    else:
+        title = "Progress Update"
+
+    embed = hikari.Embed(
+        title=title,
+        description="\n".join(fields),
+    )
+
+    if footer:
+        embed.set_footer(text=footer)
+
+    return embed
@@ -2,9 +2,35 @@ import asyncio
 import logging
 import time
 import json
+from typing import Callable
 from bloxlink_lib import create_task_log_exception, get_node_count, BaseModel, parse_into
 from bloxlink_lib.database import redis
 
+# Callbacks for channels that are listened to for as long as the bot runs, such as cache invalidations.
+_channel_listeners: dict[str, list[Callable[[dict], None]]] = {}
+_collector: "RedisMessageCollector" = None
+
+
+def listen(channel: str, callback: Callable[[dict], None]):
+    """Call the callback with every message published over the channel, on every node.
+    Callbacks run inside the listener loop, so they must be quick and synchronous.
+
+    Args:
+        channel (str): The pubsub channel.
+        callback (Callable[[dict], None]): Receives the decoded JSON of each message.
+    """
+
+    _channel_listeners.setdefault(channel, []).append(callback)
+
+    if _collector:
+        create_task_log_exception(_collector.pubsub.subscribe(channel))
+
+
+async def publish(channel: str, payload: dict):
+    """Publish a message to the listeners of a channel on every node, including this one."""
+
+    await redis.publish(channel, json.dumps(payload).encode("utf-8"))
+
 
 class FutureMessage(asyncio.Future[dict]):
     """Represents a message from Redis in the future."""
@@ -20,15 +46,22 @@ class RedisMessageCollector:
     logger = logging.getLogger("redis.collector")
 
     def __init__(self):
+        global _collector  # pylint: disable=global-statement
+
         self.pubsub = redis.pubsub()
         self._futures: dict[str, tuple[FutureMessage, bool, BaseModel | dict, list[dict]]] = {}
         self._listener_task = create_task_log_exception(self._listen_for_message())
 
+        _collector = self
+
     async def _listen_for_message(self):
         """Listen to messages over pubsub asynchronously"""
 
         self.logger.debug("Listening for messages.")
 
+        if _channel_listeners:
+            await self.pubsub.subscribe(*_channel_listeners)
+
         while True:
             if not self.pubsub.subscribed:
                 # Lets other events in the event loop trigger
@@ -42,6 +75,14 @@ class RedisMessageCollector:
 
             # Required to be converted from a byte array.
             channel: str = message["channel"]
+            channel = channel.decode() if isinstance(channel, bytes) else channel
+
+            for callback in _channel_listeners.get(channel, ()):
+                try:
+                    callback(json.loads(message["data"]))
+                except Exception: # pylint: disable=broad-except
+                    self.logger.exception(f"Listener of {channel} failed")
+
             current_future = self._futures.get(channel, None)
 
             if not current_future:
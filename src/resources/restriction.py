@@ -2,10 +2,13 @@ from typing import Literal
 
 import hikari
 from pydantic import Field
-from bloxlink_lib import MemberSerializable, fetch_typed, StatusCodes, get_user, RobloxUser, get_accounts, reverse_lookup, BaseModelArbitraryTypes, BaseModel
+from bloxlink_lib import MemberSerializable, fetch_typed, StatusCodes, RobloxUser, get_accounts, BaseModelArbitraryTypes, BaseModel
 
+from resources.api.roblox import users
 from resources.bloxlink import instance as bloxlink
-from resources.exceptions import Message, UserNotVerified
+from resources.exceptions import Message
+from resources.reverse_lookup import reverse_lookup_many
+from resources.unit_of_work import memoize
 from config import CONFIG
 
 
@@ -46,10 +49,7 @@ class Restriction(BaseModelArbitraryTypes):
             return
 
         if not self.roblox_user:
-            try:
-                self.roblox_user = await get_user(self.member.id, guild_id=self.guild_id)
-            except UserNotVerified:
-                pass
+            self.roblox_user = await users.get_linked_account(self.member.id, self.guild_id)
 
         restriction_data, restriction_response = await fetch_typed(
             RestrictionResponse,
@@ -85,29 +85,27 @@ class Restriction(BaseModelArbitraryTypes):
         """Check if the user has alternate accounts in this server."""
 
         matches: list[int] = []
-        roblox_accounts = await get_accounts(self.member.id)
+        roblox_accounts = await memoize("roblox_accounts", self.member.id, lambda: get_accounts(self.member.id))
+        linked_users = await reverse_lookup_many((account.id for account in roblox_accounts), self.member.id)
 
-        for account in roblox_accounts:
-            for user in await reverse_lookup(account, self.member.id):
-                member = await bloxlink.fetch_discord_member(self.guild_id, user, "id")
+        for user in dict.fromkeys(user for users in linked_users.values() for user in users):
+            member = await bloxlink.fetch_discord_member(self.guild_id, user, "id")
 
-                if member:
-                    matches.append(int(member.id))
+            if member:
+                matches.append(int(member.id))
 
         if matches:
             self.source = "disallowAlts"
-            self.reason = f"User has alternate accounts in this server: {', '.join(matches)}"
+            self.reason = f"User has alternate accounts in this server: {', '.join(map(str, matches))}"
 
         self.alts = matches
 
     async def check_ban_evading(self):
         """Check if the user is evading a ban in this server."""
 
-        matches = []
-        roblox_accounts = await get_accounts(self.member.id)
-
-        for account in roblox_accounts:
-            matches.append(await reverse_lookup(account, self.member.id))
+        roblox_accounts = await memoize("roblox_accounts", self.member.id, lambda: get_accounts(self.member.id))
+        linked_users = await reverse_lookup_many((account.id for account in roblox_accounts), self.member.id)
+        matches = dict.fromkeys(user for users in linked_users.values() for user in users)
 
         for user in matches:
             try:
@@ -115,10 +113,10 @@ class Restriction(BaseModelArbitraryTypes):
             except (hikari.NotFoundError, hikari.ForbiddenError):
                 continue
             else:
-                self.banned_discord_id = int(user.id)
+                self.banned_discord_id = int(user)
                 self.restricted = True
                 self.source = "banEvader"
-                self.reason = f"User is evading a ban on user {user.id}."
+                self.reason = f"User is evading a ban on user {user}."
                 self.action = "ban" # FIXME
                 break
 
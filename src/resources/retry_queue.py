@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable
+
+from bloxlink_lib import BaseModel, MemberSerializable
+from bloxlink_lib.database import redis
+
+from resources.progress import increment_progress_stats
+
+
+__all__ = ("RetryEntry", "schedule_retry", "run_retry_worker")
+
+RETRY_QUEUE_KEY = "update_retries"
+MAX_RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30 # seconds, doubled every attempt
+RETRY_MAX_DELAY = 30 * 60
+RETRY_POLL_INTERVAL = 5
+RETRY_BATCH_SIZE = 20
+RETRY_WORKER_MAX_BACKOFF = 60 # seconds the worker waits at most after failing to reach Redis
+
+# Retries across all nodes may not use more than this many member updates per second,
+# so a bad Roblox day never takes capacity away from live scans and joins.
+RETRY_BUDGET_PER_SECOND = 5
+
+
+class RetryEntry(BaseModel):
+    """A member update that failed because of an upstream error, waiting to be tried again."""
+
+    guild_id: int
+    nonce: str
+    member: MemberSerializable
+    attempt: int = 0
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so retries of one chunk don't all fire at once."""
+
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def schedule_retry(guild_id: int | str, nonce: str, member: MemberSerializable, attempt: int = 0) -> bool:
+    """Put a member in the retry queue, or give up on them if they were retried too often.
+
+    Args:
+        guild_id (int | str): The guild the member is being updated in.
+        nonce (str): The nonce of the scan the member belongs to.
+        member (MemberSerializable): The member to retry.
+        attempt (int, optional): How many times the member was retried already. Defaults to 0.
+
+    Returns:
+        bool: False if we gave up on the member.
+    """
+
+    if attempt >= MAX_RETRY_ATTEMPTS:
+        await increment_progress_stats(nonce, gave_up=1)
+        return False
+
+    entry = RetryEntry(guild_id=guild_id, nonce=nonce, member=member, attempt=attempt)
+
+    await redis.zadd(RETRY_QUEUE_KEY, {entry.model_dump_json(): time.time() + retry_delay(attempt)})
+
+    if attempt == 0:
+        await increment_progress_stats(nonce, retried=1)
+
+    return True
+
+
+async def _claim_due_entries() -> list[RetryEntry]:
+    """Take the entries that are due. Removing an entry is what claims it, so each entry is only run by one node."""
+
+    due_entries = await redis.zrangebyscore(RETRY_QUEUE_KEY, "-inf", time.time(), start=0, num=RETRY_BATCH_SIZE)
+    claimed_entries: list[RetryEntry] = []
+
+    for raw_entry in due_entries:
+        if await redis.zrem(RETRY_QUEUE_KEY, raw_entry):
+            claimed_entries.append(RetryEntry.model_validate_json(raw_entry))
+
+    return claimed_entries
+
+
+async def _take_budget():
+    """Wait until the global retry budget allows another member update."""
+
+    while True:
+        window = int(time.time())
+        budget_key = f"{RETRY_QUEUE_KEY}:budget:{window}"
+
+        async with redis.pipeline() as pipeline:
+            pipeline.incr(budget_key)
+            pipeline.expire(budget_key, 2)
+            used, _ = await pipeline.execute()
+
+        if used <= RETRY_BUDGET_PER_SECOND:
+            return
+
+        await asyncio.sleep(window + 1 - time.time())
+
+
+async def run_retry_worker(handler: Callable[[RetryEntry], Awaitable[None]]):
+    """Run due retries forever. Every node runs one of these.
+
+    Args:
+        handler (Callable[[RetryEntry], Awaitable[None]]): Retries the update of one member.
+            It is responsible for scheduling the next attempt if the update fails again.
+    """
+
+    failures = 0
+
+    while True:
+        try:
+            entries = await _claim_due_entries()
+
+            if not entries:
+                failures = 0
+                await asyncio.sleep(RETRY_POLL_INTERVAL)
+                continue
+
+            for entry in entries:
+                await _take_budget()
+
+                try:
+                    await handler(entry)
+                except Exception as ex: # pylint: disable=broad-except
+                    logging.exception(f"Failed to retry the update of member {entry.member.id} in {entry.guild_id}: {ex}")
+
+            failures = 0
+        except Exception as ex: # pylint: disable=broad-except
+            # most likely Redis is unavailable. Keep the worker alive and try again later.
+            failures += 1
+            logging.exception(f"The retry worker failed, backing off: {ex}")
+            await asyncio.sleep(min(RETRY_WORKER_MAX_BACKOFF, RETRY_POLL_INTERVAL * 2 ** failures))
@@ -0,0 +1,144 @@
+from datetime import timedelta
+from typing import Iterable
+
+from bloxlink_lib.database import fetch_user_data, redis
+from bloxlink_lib.database import update_user_data as update_user_data_uncached
+
+from resources.bloxlink import instance as bloxlink
+
+
+__all__ = ("reverse_lookup", "reverse_lookup_many", "invalidate_reverse_lookup", "update_user_data")
+
+# Links and unlinks mostly happen outside of the bot, so an entry that missed its invalidation is rebuilt after this.
+REVERSE_LOOKUP_TTL = timedelta(hours=12)
+
+# Every indexed set holds this member, so "no Discord users" is cached too and told apart from "not indexed".
+INDEXED_MARKER = "-"
+
+
+def _index_key(roblox_id: str) -> str:
+    return f"reverse_lookup:{roblox_id}"
+
+
+async def _load_discord_ids(roblox_ids: list[str]) -> dict[str, set[str]]:
+    """Find the Discord users linked to many Roblox IDs with a single database query."""
+
+    discord_ids: dict[str, set[str]] = {roblox_id: set() for roblox_id in roblox_ids}
+
+    cursor = bloxlink.mongo.bloxlink["users"].find(
+        {"$or": [{"robloxID": {"$in": roblox_ids}}, {"robloxAccounts.accounts": {"$in": roblox_ids}}]},
+        {"_id": 1, "robloxID": 1, "robloxAccounts.accounts": 1},
+    )
+
+    async for user_data in cursor:
+        linked_ids = {str(user_data.get("robloxID"))}
+        linked_ids.update(str(roblox_id) for roblox_id in (user_data.get("robloxAccounts") or {}).get("accounts") or [])
+
+        for roblox_id in linked_ids & discord_ids.keys():
+            discord_ids[roblox_id].add(str(user_data["_id"]))
+
+    return discord_ids
+
+
+async def reverse_lookup_many(
+    roblox_ids: Iterable[int | str], origin_id: int | str | None = None
+) -> dict[str, list[str]]:
+    """Find the Discord users linked to many Roblox users at once.
+
+    Indexed Roblox IDs are read from Redis, and the rest are looked up with one database query and indexed.
+
+    Args:
+        roblox_ids (Iterable[int | str]): The Roblox user IDs that will be matched against.
+        origin_id (int | str | None, optional): Discord user ID that will not be included in the output.
+            Defaults to None.
+
+    Returns:
+        dict[str, list[str]]: The linked Discord IDs, keyed by Roblox ID.
+    """
+
+    roblox_ids = list(dict.fromkeys(str(roblox_id) for roblox_id in roblox_ids))
+
+    if not roblox_ids:
+        return {}
+
+    async with redis.pipeline() as pipeline:
+        for roblox_id in roblox_ids:
+            pipeline.smembers(_index_key(roblox_id))
+
+        indexed_sets = await pipeline.execute()
+
+    discord_ids: dict[str, set[str]] = {}
+
+    for roblox_id, members in zip(roblox_ids, indexed_sets):
+        members = {member.decode() if isinstance(member, bytes) else member for member in members}
+
+        if INDEXED_MARKER in members:
+            discord_ids[roblox_id] = members - {INDEXED_MARKER}
+
+    missing_ids = [roblox_id for roblox_id in roblox_ids if roblox_id not in discord_ids]
+
+    if missing_ids:
+        loaded_ids = await _load_discord_ids(missing_ids)
+
+        async with redis.pipeline() as pipeline:
+            for roblox_id, linked_ids in loaded_ids.items():
+                pipeline.sadd(_index_key(roblox_id), INDEXED_MARKER, *linked_ids)
+                pipeline.expire(_index_key(roblox_id), REVERSE_LOOKUP_TTL)
+
+            await pipeline.execute()
+
+        discord_ids.update(loaded_ids)
+
+    return {
+        roblox_id: [discord_id for discord_id in linked_ids if discord_id != str(origin_id)]
+        for roblox_id, linked_ids in discord_ids.items()
+    }
+
+
+async def reverse_lookup(roblox_id: int | str, origin_id: int | str | None = None) -> list[str]:
+    """Find Discord IDs linked to a roblox id.
+
+    Args:
+        roblox_id (int | str): The roblox user ID that will be matched against.
+        origin_id (int | str | None, optional): Discord user ID that will not be included in the output.
+            Defaults to None.
+
+    Returns:
+        list[str]: All the discord IDs linked to this roblox_id.
+    """
+
+    return (await reverse_lookup_many([roblox_id], origin_id))[str(roblox_id)]
+
+
+async def invalidate_reverse_lookup(*roblox_ids: int | str):
+    """Drop the indexed Discord users of Roblox users. Call this after a user links or unlinks these accounts."""
+
+    if roblox_ids:
+        await redis.delete(*(_index_key(str(roblox_id)) for roblox_id in roblox_ids))
+
+
+def _linked_roblox_ids(roblox_id: int | str | None, roblox_accounts: dict | None) -> set[str]:
+    linked_ids = {str(roblox_id)} if roblox_id else set()
+    linked_ids.update(str(account_id) for account_id in (roblox_accounts or {}).get("accounts") or [])
+
+    return linked_ids
+
+
+async def update_user_data(user_id: int | str, **aspects):
+    """update_user_data() of bloxlink_lib, which also drops the indexed Discord users of the Roblox
+    accounts that the write links or unlinks."""
+
+    if "robloxID" not in aspects and "robloxAccounts" not in aspects:
+        await update_user_data_uncached(user_id, **aspects)
+        return
+
+    user_data = await fetch_user_data(user_id, "robloxID", "robloxAccounts")
+    linked_before = _linked_roblox_ids(user_data.robloxID, user_data.robloxAccounts)
+
+    await update_user_data_uncached(user_id, **aspects)
+
+    linked_after = _linked_roblox_ids(
+        aspects.get("robloxID", user_data.robloxID), aspects.get("robloxAccounts", user_data.robloxAccounts)
+    )
+
+    await invalidate_reverse_lookup(*(linked_before ^ linked_after))
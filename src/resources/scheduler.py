@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import deque
+
+from bloxlink_lib import create_task_log_exception
+from prometheus_client import Gauge
+
+from resources.premium import PremiumStatus
+
+
+__all__ = ("FairScheduler", "scheduler", "tier_weight")
+
+# Member updates per second this node performs for all guilds combined.
+NODE_MEMBERS_PER_SECOND = 25
+
+TIER_WEIGHTS = {
+    "pro": 4,
+    "premium": 2,
+    "free": 1,
+}
+
+QUEUE_DEPTH = Gauge(
+    "bloxlink_update_queue_depth",
+    "Member updates waiting for a slot on this node, per guild",
+    ["guild_id"],
+)
+
+
+def tier_weight(premium_status: PremiumStatus) -> int:
+    """The share of the node a guild gets compared to a free guild."""
+
+    if not premium_status.active:
+        return TIER_WEIGHTS["free"]
+
+    if "pro" in (premium_status.features or ()):
+        return TIER_WEIGHTS["pro"]
+
+    return TIER_WEIGHTS["premium"]
+
+
+class FairScheduler:
+    """Hands out member update slots across guilds with weighted fair queueing.
+
+    Every guild with waiting work gets slots in proportion to its weight, so a huge free guild
+    can't starve a small premium guild, and the node never exceeds its member/sec cap.
+    """
+
+    def __init__(self, members_per_second: float):
+        self.members_per_second = members_per_second
+
+        self._queues: dict[int, deque[asyncio.Future]] = {}
+        self._weights: dict[int, int] = {}
+        self._finish_tags: dict[int, float] = {}
+        self._virtual_time = 0.0
+        self._next_slot_at = 0.0
+        self._work_available = asyncio.Event()
+        self._dispatcher: asyncio.Task = None
+
+    def queue_depth(self, guild_id: int = None) -> int:
+        """The amount of waiting member updates of one guild, or of every guild."""
+
+        if guild_id is not None:
+            return len(self._queues.get(guild_id, ()))
+
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, guild_id: int, weight: int = 1):
+        """Wait until this guild may update its next member.
+
+        Args:
+            guild_id (int): The guild the member belongs to.
+            weight (int, optional): The weight of the guild. See tier_weight(). Defaults to 1.
+        """
+
+        guild_id = int(guild_id)
+
+        if not self._dispatcher or self._dispatcher.done():
+            self._dispatcher = create_task_log_exception(self._dispatch())
+
+        queue = self._queues.get(guild_id)
+
+        if queue is None:
+            # A guild that was idle starts at the current virtual time, so it can't claim the slots it didn't use.
+            queue = self._queues[guild_id] = deque()
+            self._finish_tags[guild_id] = max(self._finish_tags.get(guild_id, 0.0), self._virtual_time)
+
+        self._weights[guild_id] = weight
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+
+        QUEUE_DEPTH.labels(guild_id=str(guild_id)).set(len(queue))
+        self._work_available.set()
+
+        await future
+
+    def _next_guild(self) -> int | None:
+        """The guild whose next slot finishes first in virtual time."""
+
+        next_guild_id = None
+        next_finish_tag = None
+
+        for guild_id, queue in self._queues.items():
+            finish_tag = self._finish_tags[guild_id] + 1 / self._weights[guild_id]
+
+            if queue and (next_finish_tag is None or finish_tag < next_finish_tag):
+                next_guild_id = guild_id
+                next_finish_tag = finish_tag
+
+        return next_guild_id
+
+    async def _dispatch(self):
+        while True:
+            guild_id = self._next_guild()
+
+            if guild_id is None:
+                self._work_available.clear()
+                await self._work_available.wait()
+                continue
+
+            now = time.monotonic()
+
+            if self._next_slot_at > now:
+                # pick the guild again afterwards, work with an earlier finish tag may have arrived
+                await asyncio.sleep(self._next_slot_at - now)
+                continue
+
+            queue = self._queues[guild_id]
+            future = queue.popleft()
+
+            if not future.done():
+                self._next_slot_at = now + 1 / self.members_per_second
+                self._virtual_time = self._finish_tags[guild_id]
+                self._finish_tags[guild_id] += 1 / self._weights[guild_id]
+
+                future.set_result(None)
+
+            # futures that are already done were cancelled while waiting and don't use a slot
+
+            QUEUE_DEPTH.labels(guild_id=str(guild_id)).set(len(queue))
+            self._forget_if_empty(guild_id)
+
+    def _forget_if_empty(self, guild_id: int):
+        if self._queues[guild_id]:
+            return
+
+        del self._queues[guild_id]
+        del self._weights[guild_id]
+        QUEUE_DEPTH.remove(str(guild_id))
+
+        # the finish tag only matters while the guild is ahead of everyone else
+        if self._finish_tags[guild_id] <= self._virtual_time:
+            del self._finish_tags[guild_id]
+
+
+scheduler = FairScheduler(NODE_MEMBERS_PER_SECOND)
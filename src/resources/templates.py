@@ -0,0 +1,119 @@
+import functools
+import re
+from typing import TYPE_CHECKING, Mapping
+
+if TYPE_CHECKING:
+    import hikari
+    from bloxlink_lib import MemberSerializable, RobloxUser
+
+
+__all__ = ("CompiledTemplate", "compile_template", "template_values", "render_template")
+
+# Matches any case, so that templates spelling a placeholder in upper case are left to parse_template()
+PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z0-9-]+)\}")
+
+# Placeholders that only need the member, their Roblox account and the guild name. Templates with any other
+# placeholder (such as group ranks or {smart-name}) are left to parse_template(). Checked against
+# parse_template() by benchmarks/templates.py.
+LOCAL_PLACEHOLDERS = frozenset({
+    "roblox-name",
+    "roblox-id",
+    "display-name",
+    "discord-name",
+    "discord-nick",
+    "discord-mention",
+    "discord-id",
+    "server-name",
+})
+
+
+class CompiledTemplate:
+    """A template split into literal text and placeholder names, so that rendering it is a join."""
+
+    __slots__ = ("template", "segments", "placeholders", "is_local")
+
+    def __init__(self, template: str):
+        self.template = template
+
+        # literals at even indexes, placeholder names at odd indexes
+        self.segments: tuple[str, ...] = tuple(PLACEHOLDER_PATTERN.split(template))
+        self.placeholders = frozenset(self.segments[1::2])
+        self.is_local = self.placeholders <= LOCAL_PLACEHOLDERS
+
+    def render(self, values: Mapping[str, str], max_length: int | None = None) -> str:
+        """Fill in the placeholders. Placeholders without a value are kept as they are."""
+
+        rendered = "".join(
+            segment if i % 2 == 0 else values.get(segment, f"{{{segment}}}")
+            for i, segment in enumerate(self.segments)
+        )
+
+        return rendered[:max_length] if max_length else rendered
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template once. Guilds share a handful of templates, so these are cached by the template string."""
+
+    return CompiledTemplate(template)
+
+
+def template_values(
+    guild_name: str, member: "hikari.Member | MemberSerializable", roblox_user: "RobloxUser"
+) -> dict[str, str]:
+    """The values of the local placeholders for a member."""
+
+    return {
+        "roblox-name": roblox_user.username,
+        "roblox-id": str(roblox_user.id),
+        "display-name": roblox_user.display_name,
+        "discord-name": member.username,
+        "discord-nick": member.nickname or member.username,
+        "discord-mention": f"<@{member.id}>",
+        "discord-id": str(member.id),
+        "server-name": guild_name,
+    }
+
+
+async def render_template(
+    *,
+    guild_id: int,
+    guild_name: str,
+    member: "hikari.Member | MemberSerializable",
+    roblox_user: "RobloxUser",
+    template: str,
+    max_length: int | bool = True,
+) -> str:
+    """parse_template() of bloxlink_lib, rendered from the compiled template when it only uses local placeholders.
+
+    Args:
+        guild_id (int): The ID of the guild.
+        guild_name (str): The name of the guild.
+        member (hikari.Member | MemberSerializable): The member the template is for.
+        roblox_user (RobloxUser): The synced Roblox account of the member.
+        template (str): The template.
+        max_length (int | bool, optional): Truncate to this length, or to the 32 characters of a nickname when True.
+            Defaults to True.
+
+    Returns:
+        str: The rendered template.
+    """
+
+    compiled = compile_template(template) if template else None
+
+    if compiled is None or not compiled.is_local:
+        from bloxlink_lib import parse_template # pylint: disable=import-outside-toplevel
+
+        return await parse_template(
+            guild_id=guild_id,
+            guild_name=guild_name,
+            member=member,
+            roblox_user=roblox_user,
+            template=template,
+            max_length=max_length,
+        )
+
+    if max_length is True:
+        max_length = 32
+
+    return compiled.render(template_values(guild_name, member, roblox_user), max_length or None)
@@ -1,6 +1,14 @@
-from typing import TYPE_CHECKING
-from bloxlink_lib import get_binds, BaseModel, RobloxUser
+import asyncio
+import functools
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from bloxlink_lib import BaseModel, RobloxUser
+from prometheus_client import Histogram
+
 from resources.api.roblox import users
+from resources.cache import Cache
 from resources.exceptions import RobloxAPIError, RobloxNotFound
 
 
@@ -8,6 +16,27 @@ if TYPE_CHECKING:
     from resources.commands import CommandContext
 
 
+AUTOCOMPLETE_LATENCY = Histogram(
+    "bloxlink_autocomplete_seconds",
+    "Time taken to answer autocomplete interactions, by handler and result: hit, miss or superseded",
+    ["handler", "result"],
+    # Discord drops autocomplete responses after 3 seconds
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 1.5, 2, 2.5, 3, 5),
+)
+
+MISSING = object()
+
+# Choices by (guild, command, focused option, normalized option values). Short, since binds and users can change.
+autocomplete_cache: Cache[tuple, list["AutocompleteOption"]] = Cache(
+    "autocomplete",
+    ttl=timedelta(seconds=15),
+    max_entries=20_000,
+)
+
+# The choices being worked out for each (user, command, focused option). A new keystroke supersedes them.
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
 class AutocompleteOption(BaseModel):
     """Represents an autocomplete option."""
 
@@ -15,20 +44,79 @@ class AutocompleteOption(BaseModel):
     value: str
 
 
-async def bind_category_autocomplete(ctx: 'CommandContext'):
+def autocomplete_handler(fn: Callable[["CommandContext"], Awaitable[list[AutocompleteOption]]]):
+    """Decorator for autocomplete handlers, which return their choices instead of a response.
+
+    Choices are cached per guild, command, focused option and normalized option values. When the same user types
+    again before their previous choices are ready, the previous lookup is cancelled and answered with no choices,
+    as Discord only shows the latest response.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(ctx: "CommandContext"):
+        interaction = ctx.interaction
+        start = time.perf_counter()
+
+        focused_option = next(x for x in interaction.options if x.is_focused)
+        option_values = tuple(sorted((o.name, str(o.value or "").strip().lower()) for o in interaction.options))
+
+        cache_key = (interaction.guild_id, interaction.command_name, focused_option.name, option_values)
+        inflight_key = (interaction.user.id, interaction.command_name, focused_option.name)
+
+        choices = autocomplete_cache.peek(cache_key, MISSING)
+        result = "hit"
+
+        if choices is MISSING:
+            result = "miss"
+            task = asyncio.create_task(fn(ctx))
+
+            previous_task = _inflight.get(inflight_key)
+            if previous_task and not previous_task.done():
+                previous_task.cancel()
+
+            _inflight[inflight_key] = task
+
+            try:
+                choices = await task
+            except asyncio.CancelledError:
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+                result = "superseded"
+                choices = []
+            finally:
+                if _inflight.get(inflight_key) is task:
+                    del _inflight[inflight_key]
+
+            if result == "miss":
+                await autocomplete_cache.set(cache_key, choices)
+
+        AUTOCOMPLETE_LATENCY.labels(handler=fn.__name__, result=result).observe(time.perf_counter() - start)
+
+        return ctx.response.send_autocomplete(choices)
+
+    return wrapper
+
+
+@autocomplete_handler
+async def bind_category_autocomplete(ctx: 'CommandContext') -> list[AutocompleteOption]:
     """Autocomplete for a bind category input based upon the binds the user has."""
 
+    from resources.binds import get_binds # pylint: disable=import-outside-toplevel
+
     binds = await get_binds(ctx.guild_id)
-    print(binds)
     bind_types = set(bind.type for bind in binds)
 
-    return ctx.response.send_autocomplete([AutocompleteOption(name=x, value=x.lower()) for x in bind_types])
+    return [AutocompleteOption(name=x, value=x.lower()) for x in bind_types]
 
 
-async def bind_id_autocomplete(ctx: 'CommandContext'):
+@autocomplete_handler
+async def bind_id_autocomplete(ctx: 'CommandContext') -> list[AutocompleteOption]:
     """Autocomplete for bind ID inputs, expects that there is an additional category option in the
     command arguments that must be set prior to this argument."""
 
+    from resources.binds import get_binds # pylint: disable=import-outside-toplevel
+
     interaction = ctx.interaction
 
     choices = [
@@ -53,21 +141,22 @@ async def bind_id_autocomplete(ctx: 'CommandContext'):
         for bind in filtered_binds:
             choices.append(AutocompleteOption(name=str(bind), value=str(bind)))
 
-    return ctx.response.send_autocomplete(choices)
+    return choices
 
 
-async def roblox_lookup_autocomplete(ctx: 'CommandContext'):
+@autocomplete_handler
+async def roblox_lookup_autocomplete(ctx: 'CommandContext') -> list[AutocompleteOption]:
     """Return a matching roblox user from a user's input."""
 
     interaction = ctx.interaction
     option = next(x for x in interaction.options if x.is_focused) # Makes sure that we get the correct command input in a generic way
-    user_input = str(option.value)
+    user_input = str(option.value).strip()
 
     user: RobloxUser = None
-    result_list: list[str] = []
+    result_list: list[AutocompleteOption] = []
 
     if not user_input:
-        return interaction.build_response([])
+        return []
 
     try:
         user = await users.get_user_from_string(user_input)
@@ -79,4 +168,4 @@ async def roblox_lookup_autocomplete(ctx: 'CommandContext'):
     else:
         result_list.append(AutocompleteOption(name="No user found. Please double check the username or ID.", value="no_user"))
 
-    return ctx.response.send_autocomplete(result_list)
+    return result_list
@@ -13,6 +13,10 @@ class InteractiveMessage(BaseModelArbitraryTypes):
 
     embed_description: str | None = None
 
+    # Set by apply_binds() when the member's binds were evaluated and applied, rather than the member
+    # being restricted, removed or left alone because of an error.
+    binds_applied: bool = False
+
     def model_post_init(self, __context: Any) -> None:
         if self.embed_description:
             if not self.embed:
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+from prometheus_client import Counter
+
+
+__all__ = (
+    "unit_of_work",
+    "in_unit_of_work",
+    "iterate_in_unit_of_work",
+    "memoize",
+    "prime_memoized",
+    "forget_memoized",
+)
+
+UNIT_OF_WORK_READS = Counter(
+    "bloxlink_unit_of_work_reads_total",
+    "Reads through the unit-of-work memo by kind and result: hit (a duplicate read that was avoided) or miss",
+    ["kind", "result"],
+)
+
+# The reads of the current interaction or member chunk. Tasks started inside a unit copy the context and
+# share the same dict, so concurrent updates of a chunk share their reads.
+_current_unit: ContextVar[dict[tuple[str, Hashable], asyncio.Future] | None] = ContextVar("unit_of_work", default=None)
+
+
+@contextmanager
+def unit_of_work():
+    """Memoize reads made through memoize() until the block exits. Use one per interaction or member chunk.
+
+    The block must not contain a yield of an async generator, see iterate_in_unit_of_work() for those.
+    """
+
+    token = _current_unit.set({})
+
+    try:
+        yield
+    finally:
+        _current_unit.reset(token)
+
+
+def in_unit_of_work[**P, T](fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    """Decorator that runs every call of a coroutine function in its own unit of work."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        with unit_of_work():
+            return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+async def iterate_in_unit_of_work[T](generator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Iterate an async generator in its own unit of work, such as an interaction handler.
+
+    The unit is only current while the generator runs. It is not current while the generator is suspended
+    at a yield, so it never leaks into the code that consumes the generator.
+    """
+
+    unit: dict[tuple[str, Hashable], asyncio.Future] = {}
+
+    try:
+        while True:
+            token = _current_unit.set(unit)
+
+            try:
+                item = await anext(generator)
+            except StopAsyncIteration:
+                return
+            finally:
+                _current_unit.reset(token)
+
+            yield item
+    finally:
+        token = _current_unit.set(unit)
+
+        try:
+            await generator.aclose()
+        finally:
+            _current_unit.reset(token)
+
+
+def _forget_failed(
+    unit: dict[tuple[str, Hashable], asyncio.Future], key: tuple[str, Hashable], future: asyncio.Future
+):
+    if (future.cancelled() or future.exception() is not None) and unit.get(key) is future:
+        del unit[key]
+
+
+async def memoize(kind: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Read a value once per unit of work. Outside of a unit of work this just calls the loader.
+
+    Reads that fail are forgotten once they are done, so the next read tries again. Callers already waiting
+    on a failed read get its error.
+
+    Args:
+        kind (str): What is being read, such as "linked_account". Used as the metric label.
+        key (Hashable): What identifies the value within its kind.
+        loader (Callable[[], Awaitable[Any]]): Reads the value.
+
+    Returns:
+        Any: The value returned by the loader.
+    """
+
+    unit = _current_unit.get()
+
+    if unit is None:
+        return await loader()
+
+    future = unit.get((kind, key))
+
+    if future is None:
+        UNIT_OF_WORK_READS.labels(kind=kind, result="miss").inc()
+        future = unit[(kind, key)] = asyncio.ensure_future(loader())
+        future.add_done_callback(functools.partial(_forget_failed, unit, (kind, key)))
+    else:
+        UNIT_OF_WORK_READS.labels(kind=kind, result="hit").inc()
+
+    # shielded, so one caller giving up doesn't cancel the read for the others
+    return await asyncio.shield(future)
+
+
+def prime_memoized(kind: str, key: Hashable, value: Any):
+    """Memoize a value that was read some other way, such as in bulk, so that later reads of it are hits."""
+
+    unit = _current_unit.get()
+
+    if unit is not None:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        unit[(kind, key)] = future
+
+
+def forget_memoized(kind: str, key: Hashable):
+    """Drop a memoized value from the current unit of work. Call this after writing to what it read."""
+
+    unit = _current_unit.get()
+
+    if unit is not None:
+        unit.pop((kind, key), None)
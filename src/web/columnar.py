@@ -0,0 +1,212 @@
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+
+__all__ = (
+    "COLUMNAR_CONTENT_TYPE",
+    "COLUMNAR_VERSION",
+    "MAX_COLUMNAR_SIZE",
+    "MemberColumns",
+    "MemberRecord",
+    "encode_members",
+    "decode_members",
+)
+
+# The Content-Type the gateway sends columnar chunks with, instead of application/json.
+COLUMNAR_CONTENT_TYPE = "application/vnd.bloxlink.member-columns+json"
+COLUMNAR_VERSION = 1
+
+# Columnar chunks are parsed at once, so their decompressed size is capped. A chunk of 1000 members is ~300KB.
+MAX_COLUMNAR_SIZE = 16 * 1024 * 1024
+
+# Columns that the first gateways didn't send. Members of chunks without them get None for these fields.
+OPTIONAL_COLUMNS = ("display_names", "avatar_urls", "avatar_hashes", "joined_at")
+
+
+class MemberRecord:
+    """One member of a columnar chunk. It reads straight from the arrays of its chunk,
+    so a chunk of records costs a handful of arrays instead of one model per member."""
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: "MemberColumns", index: int):
+        self._columns = columns
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return self._columns.ids[self._index]
+
+    @property
+    def username(self) -> str:
+        return self._columns.usernames[self._index]
+
+    @property
+    def nickname(self) -> str | None:
+        return self._columns.nicknames[self._index]
+
+    @property
+    def role_ids(self) -> Sequence[int]:
+        offsets = self._columns.role_offsets
+        return self._columns.role_ids[offsets[self._index]:offsets[self._index + 1]]
+
+    @property
+    def is_bot(self) -> bool:
+        return bool(self._columns.is_bot[self._index])
+
+    def to_dict(self) -> dict:
+        """The fields of the member, for building a full member model when one is needed.
+        These are the same fields the gateway sends for a member of a JSON chunk."""
+
+        columns = self._columns
+        index = self._index
+
+        return {
+            "id": self.id,
+            "username": self.username,
+            "display_name": columns.display_names[index],
+            "avatar_url": columns.avatar_urls[index],
+            "avatar_hash": columns.avatar_hashes[index],
+            "is_bot": self.is_bot,
+            "joined_at": columns.joined_at[index],
+            "role_ids": list(self.role_ids),
+            "guild_id": columns.guild_id,
+            "nickname": self.nickname,
+            "mention": f"<@{self.id}>",
+        }
+
+    def __repr__(self):
+        return f"MemberRecord(id={self.id}, username={self.username!r})"
+
+
+class MemberColumns(Sequence[MemberRecord]):
+    """The decoded columns of a chunk. Indexing it returns MemberRecords."""
+
+    def __init__(
+        self,
+        guild_id: int,
+        ids: array,
+        usernames: list[str],
+        nicknames: list[str | None],
+        role_offsets: array,
+        role_ids: array,
+        is_bot: bytes,
+        display_names: Sequence[str | None],
+        avatar_urls: Sequence[str | None],
+        avatar_hashes: Sequence[str | None],
+        joined_at: Sequence[str | None],
+    ):
+        self.guild_id = guild_id
+        self.ids = ids
+        self.usernames = usernames
+        self.nicknames = nicknames
+        self.role_offsets = role_offsets
+        self.role_ids = role_ids
+        self.is_bot = is_bot
+        self.display_names = display_names
+        self.avatar_urls = avatar_urls
+        self.avatar_hashes = avatar_hashes
+        self.joined_at = joined_at
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> MemberRecord:
+        if not isinstance(index, int):
+            raise TypeError("MemberColumns can only be indexed with integers")
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError("member index out of range")
+
+        return MemberRecord(self, index)
+
+    def __iter__(self) -> Iterator[MemberRecord]:
+        return (MemberRecord(self, index) for index in range(len(self)))
+
+
+def encode_members(guild_id: int, nonce: str, members: Iterable[dict]) -> dict:
+    """Build a columnar chunk from member dicts, shaped like the members of a JSON chunk.
+
+    This is what the gateway sends; it lives here so both sides share one definition of the format.
+
+    Returns:
+        dict: The payload, ready to be serialized as JSON.
+    """
+
+    payload = {
+        "version": COLUMNAR_VERSION,
+        "guild_id": guild_id,
+        "nonce": nonce,
+        "ids": [],
+        "usernames": [],
+        "nicknames": [],
+        "role_offsets": [0],
+        "role_ids": [],
+        "is_bot": [],
+        "display_names": [],
+        "avatar_urls": [],
+        "avatar_hashes": [],
+        "joined_at": [],
+    }
+
+    for member in members:
+        payload["ids"].append(int(member["id"]))
+        payload["usernames"].append(member["username"])
+        payload["nicknames"].append(member.get("nickname"))
+        payload["role_ids"].extend(int(role_id) for role_id in member.get("role_ids") or ())
+        payload["role_offsets"].append(len(payload["role_ids"]))
+        payload["is_bot"].append(int(bool(member.get("is_bot"))))
+        payload["display_names"].append(member.get("display_name"))
+        payload["avatar_urls"].append(member.get("avatar_url"))
+        payload["avatar_hashes"].append(member.get("avatar_hash"))
+        payload["joined_at"].append(member.get("joined_at"))
+
+    return payload
+
+
+def decode_members(payload: dict) -> MemberColumns:
+    """Decode the members of a columnar chunk.
+
+    Args:
+        payload (dict): The parsed JSON body.
+
+    Raises:
+        ValueError: When the payload has an unknown version or its columns don't line up.
+
+    Returns:
+        MemberColumns: The members of the chunk.
+    """
+
+    if payload.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar payload version: {payload.get('version')}")
+
+    try:
+        guild_id = int(payload["guild_id"])
+        ids = array("Q", payload["ids"])
+        usernames = payload["usernames"]
+        nicknames = payload["nicknames"]
+        role_offsets = array("L", payload["role_offsets"])
+        role_ids = array("Q", payload["role_ids"])
+        is_bot = bytes(payload["is_bot"])
+        optional_columns = [list(payload.get(column) or [None] * len(ids)) for column in OPTIONAL_COLUMNS]
+    except (KeyError, TypeError, OverflowError) as ex:
+        raise ValueError(f"Malformed columnar payload: {ex}") from None
+
+    member_count = len(ids)
+
+    if (
+        not len(usernames) == len(nicknames) == len(is_bot) == member_count
+        or len(role_offsets) != member_count + 1
+        or any(len(column) != member_count for column in optional_columns)
+    ):
+        raise ValueError("The columns of the payload have different lengths")
+
+    if role_offsets[0] != 0 or role_offsets[-1] != len(role_ids) or any(
+        start > end for start, end in zip(role_offsets, role_offsets[1:])
+    ):
+        raise ValueError("The role offsets of the payload are out of order")
+
+    return MemberColumns(guild_id, ids, usernames, nicknames, role_offsets, role_ids, is_bot, *optional_columns)
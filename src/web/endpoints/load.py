@@ -0,0 +1,25 @@
+from blacksheep import Request, ok
+from blacksheep.server.controllers import APIController, get
+
+from resources.load import load_monitor
+from web.webserver import webserver
+
+from ..decorators import authenticate
+
+
+class Load(APIController):
+    """Results in a path of <URL>/api/load/..."""
+
+    @get("/")
+    @authenticate()
+    async def get_load(self, _request: Request):
+        """Endpoint for the gateway to pick the least loaded node. Only reads in-memory counters."""
+
+        return ok(load_monitor.report().model_dump())
+
+
+@webserver.on_start
+async def start_load_monitor(_):
+    """Start measuring the load of this node."""
+
+    load_monitor.start()
@@ -1,7 +1,10 @@
 from blacksheep import Request, ok
-from blacksheep.server.controllers import APIController, get
+from blacksheep.server.controllers import APIController, get, post
+from bloxlink_lib import create_task_log_exception
 
-from resources.premium import get_premium_status
+from resources.entitlements import run_entitlement_sync
+from resources.premium import get_premium_status, invalidate_premium_status
+from web.webserver import webserver
 
 from ..decorators import authenticate
 
@@ -28,9 +31,27 @@ class Premium(APIController):
             "premium": False,
         })
 
+    @post("/guilds/{guild_id}/invalidate")
+    @authenticate()
+    async def invalidate_guild_premium(self, guild_id: str, request: Request):
+        """Endpoint for the premium webhooks and the dashboard to report that the premium of a guild changed."""
+
+        await invalidate_premium_status(guild_id)
+
+        return ok({
+            "success": True,
+        })
+
     @get("/users/{user_id}")
     @authenticate()
     async def check_user_premium(self, user_id: str, request: Request):
         """Endpoint to check whether the user has premium/pro."""
 
         raise NotImplementedError()
+
+
+@webserver.on_start
+async def start_entitlement_sync(_):
+    """Take part in the periodic entitlement sync on this node."""
+
+    create_task_log_exception(run_entitlement_sync())
@@ -1,18 +1,54 @@
 import logging
 import asyncio
+import json
+import uuid
+from http import HTTPStatus
+from typing import Sequence
 
-from blacksheep import FromJSON, Request, ok, status_code
+from blacksheep import FromJSON, Request, bad_request, ok, status_code
 from blacksheep.server.controllers import APIController, get, post
-import hikari
-from bloxlink_lib.database import fetch_guild_data, redis
-from bloxlink_lib import get_user_account, BaseModel, MemberSerializable, RobloxDown, StatusCodes
+from bloxlink_lib.database import redis
+from bloxlink_lib import create_task_log_exception, BaseModel, MemberSerializable, RobloxDown, StatusCodes
+from pydantic import ValidationError
 
 from resources import binds
-from resources.bloxlink import instance as bloxlink
-from resources.exceptions import BloxlinkForbidden
+from resources.api.roblox import users
+from resources.breaker import BREAKER_REASON, is_breaker_open, record_forbidden, reset_breaker
+from resources.dm_queue import QueuedDM, queue_dm, run_dm_worker
+from resources.exceptions import BloxlinkForbidden, Message, RobloxAPIError
+from resources.fingerprints import FingerprintContext, fetch_fingerprints, member_fingerprint, save_fingerprints
+from resources.guild_data import fetch_guild_data
+from resources.join_burst import (
+    JOIN_BATCH_DELAY,
+    JOIN_BATCH_SIZE,
+    claim_join_flusher,
+    has_queued_joins,
+    keep_join_flusher,
+    queue_join,
+    record_join,
+    release_join_flusher,
+    take_queued_joins,
+)
+from resources.load import Overload, load_monitor
+from resources.progress import halt_progress, increment_progress_stats, is_cancelled
+from resources.premium import get_premium_status
+from resources.retry_queue import RetryEntry, run_retry_worker, schedule_retry
+from resources.scheduler import scheduler, tier_weight
+from resources.unit_of_work import in_unit_of_work, unit_of_work
+from web.columnar import COLUMNAR_CONTENT_TYPE, MAX_COLUMNAR_SIZE, MemberRecord, decode_members
+from web.streaming import JSONArrayStream, PayloadTooLarge, UnsupportedEncoding, decompressor_for
+from web.webserver import webserver
 
 from ..decorators import authenticate
 
+GROUP_SYNC_CONCURRENCY = 10
+
+# Errors caused by Roblox or the bind API rather than the member. Members that hit these are retried later.
+UPSTREAM_ERRORS = (RobloxDown, RobloxAPIError, Message)
+
+# Members of a streamed chunk are processed in batches of this size while the rest is still being uploaded.
+STREAM_BATCH_SIZE = 50
+
 
 class UpdateUsersPayload(BaseModel):
     """
@@ -20,15 +56,13 @@ class UpdateUsersPayload(BaseModel):
     is made regarding updating a chunk of users.
 
     guild_id (str): ID of the guild were users should be updated.
-    channel_id (str): ID of the channel that the bot should send a message to when done.
-    members (list): List of cached members, each element should
-        represent a type reflecting a hikari.Member object (JSON representation?).
-    is_done (bool): Used to tell the server if it is done sending chunks for this session, so on complete send
-        the message saying the scan is complete.
+    nonce (str): The nonce of the scan this chunk belongs to.
+
+    The members of the chunk are not part of this model. They are parsed one by one from the "members"
+    array of the body while it is being uploaded, so guild_id and nonce must be sent before it.
     """
 
     guild_id: int
-    members: list[MemberSerializable]
     nonce: str
 
 
@@ -48,6 +82,15 @@ class MemberJoinPayload(BaseModel):
     member: MemberSerializable
 
 
+def overloaded_response(overload: Overload):
+    """The response that tells the gateway to back off, and for how long."""
+
+    response = status_code(overload.status, {"error": overload.reason})
+    response.add_header(b"Retry-After", str(overload.retry_after).encode())
+
+    return response
+
+
 class Update(APIController):
     """Results in a path of <URL>/api/update/..."""
 
@@ -59,26 +102,35 @@ class Update(APIController):
 
     @post("/users")
     @authenticate()
-    async def post_users(self, content: FromJSON[UpdateUsersPayload], _request: Request):
+    async def post_users(self, request: Request):
         """Endpoint to receive /verifyall user chunks from the gateway.
 
-        Args:
-            content (FromJSON[UpdateUsersPayload]): Request data from the gateway.
-                See UpdateUsersPayload for expected JSON variables.
+        The body is a JSON object (see UpdateUsersPayload) that may be compressed with gzip or zstd.
+        It is parsed as it arrives and members are updated in batches, so memory use does not grow with
+        the size of the chunk.
+
+        Gateways that send the COLUMNAR_CONTENT_TYPE use the columnar format of web.columnar instead.
         """
 
-        content: UpdateUsersPayload = content.value
+        if overload := load_monitor.overload():
+            return overloaded_response(overload)
 
-        # Update users, send response only when this is done
-        await process_update_members(content.members, content.guild_id, content.nonce)
+        content_encoding = (
+            request.get_first_header(b"Content-Encoding").decode()
+            if request.has_header(b"Content-Encoding")
+            else None
+        )
 
-        # TODO: We're currently waiting until this chunk is done before replying. This is likely not reliable
-        # for the gateway to wait upon in the event of HTTP server reboots.
-        # Either the gateway should TTL after some time frame, or we should reply with a 202 (accepted) as soon
-        # as the request is received, with a way to check the status (like nonces?)
-        return ok({
-            "success": True
-        })
+        try:
+            decompressor = decompressor_for(content_encoding)
+        except UnsupportedEncoding as ex:
+            return status_code(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {"error": str(ex)})
+
+        with load_monitor.track("chunk"):
+            if request.content_type().split(b";")[0].strip().decode() == COLUMNAR_CONTENT_TYPE:
+                return await update_members_columnar(request, decompressor)
+
+            return await update_members_stream(request, decompressor)
 
     @post("/join/{guild_id}/{user_id}")
     @authenticate()
@@ -91,15 +143,26 @@ class Update(APIController):
     ):
         """Endpoint to handle guild member join events from the gateway.
 
+        When a guild gets more joins than JOIN_BURST_THRESHOLD per JOIN_BURST_WINDOW, joins are queued
+        and answered with a 202. See flush_join_burst().
+
         Args:
             guild_id (str): The guild ID the user joined.
             user_id (str): The ID of the user.
             user_data (FromJSON[MemberSerializable]): Additional user data from the gateway.
         """
 
+        if overload := load_monitor.overload():
+            return overloaded_response(overload)
+
         content: MemberJoinPayload = content.value
         member = content.member
 
+        if await is_breaker_open(guild_id):
+            return status_code(StatusCodes.FORBIDDEN, {
+                "error": "Bloxlink does not have permissions to give roles."
+            })
+
         guild_data = await fetch_guild_data(
             guild_id, "autoRoles", "autoVerification", "highTrafficServer"
         )
@@ -110,30 +173,48 @@ class Update(APIController):
             })
 
         if guild_data.autoVerification or guild_data.autoRoles:
-            roblox_account = await get_user_account(user_id, guild_id=guild_id, raise_errors=False)
+            if await record_join(guild_id):
+                # the guild is in a join burst, so this member is updated with the next batch of its joins
+                await queue_join(guild_id, member)
 
-            try:
-                bot_response = await binds.apply_binds(
-                    member,
-                    guild_id,
-                    roblox_account,
-                    moderate_user=True,
-                    update_embed_for_unverified=True,
-                    mention_roles=False
-                )
+                if await claim_join_flusher(guild_id):
+                    create_task_log_exception(flush_join_burst(guild_id))
 
-            except BloxlinkForbidden:
-                return status_code(StatusCodes.FORBIDDEN, {
-                    "error": "Bloxlink does not have permissions to give roles."
+                return status_code(HTTPStatus.ACCEPTED, {
+                    "success": True,
+                    "queued": True,
                 })
 
-            try:
-                dm_channel = await bloxlink.rest.create_dm_channel(user_id)
-                await dm_channel.send(content=bot_response.content, embed=bot_response.embed, components=bot_response.action_rows)
-            except hikari.BadRequestError:
-                return status_code(StatusCodes.FORBIDDEN, {
-                    "error": "Bloxlink can't DM this user."
-                })
+            with load_monitor.track("join"), unit_of_work():
+                roblox_account = await users.get_linked_account(user_id, guild_id)
+
+                try:
+                    bot_response = await binds.apply_binds(
+                        member,
+                        guild_id,
+                        roblox_account,
+                        moderate_user=True,
+                        update_embed_for_unverified=True,
+                        mention_roles=False
+                    )
+
+                except BloxlinkForbidden:
+                    await record_forbidden(guild_id)
+
+                    return status_code(StatusCodes.FORBIDDEN, {
+                        "error": "Bloxlink does not have permissions to give roles."
+                    })
+
+                await reset_breaker(guild_id)
+
+            # roles are applied, so reply now and let the DM go out in the background
+            await queue_dm(QueuedDM(
+                guild_id=guild_id,
+                user_id=user_id,
+                content=bot_response.content,
+                embed=bot_response.embed,
+                components=bot_response.action_rows,
+            ))
 
             return ok({
                 "success": True,
@@ -144,25 +225,285 @@ class Update(APIController):
         })
 
 
-async def process_update_members(members: list[MemberSerializable], guild_id: str, nonce: str):
-    """Process a list of members to update from the gateway."""
+async def update_members_stream(request: Request, decompressor):
+    """Update the members of a chunk while its body is still being uploaded."""
+
+    stream = JSONArrayStream("members")
+    payload: UpdateUsersPayload = None
+    pending_members: list[MemberSerializable] = []
+
+    try:
+        async for data in request.stream():
+            for piece in decompressor.decompress(data):
+                for raw_member in stream.feed(piece):
+                    pending_members.append(MemberSerializable.model_validate(raw_member))
+
+            if payload is None and pending_members:
+                # the members can't be processed, or dropped, before the header is known, so it must come first
+                try:
+                    payload = UpdateUsersPayload.model_validate(stream.header)
+                except ValidationError:
+                    raise ValueError("guild_id and nonce must come before the members array") from None
+
+            if payload and len(pending_members) >= STREAM_BATCH_SIZE:
+                await process_update_members(pending_members, payload.guild_id, payload.nonce)
+                pending_members = []
+
+        for raw_member in stream.feed(decompressor.flush(), final=True):
+            pending_members.append(MemberSerializable.model_validate(raw_member))
+
+        payload = payload or UpdateUsersPayload.model_validate(stream.header)
+
+    except PayloadTooLarge as ex:
+        return status_code(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(ex)})
+    except (ValueError, ValidationError) as ex:
+        return bad_request({"error": f"Invalid chunk payload: {ex}"})
+
+    if pending_members:
+        await process_update_members(pending_members, payload.guild_id, payload.nonce)
+
+    # TODO: We're currently waiting until this chunk is done before replying. This is likely not reliable
+    # for the gateway to wait upon in the event of HTTP server reboots.
+    # Either the gateway should TTL after some time frame, or we should reply with a 202 (accepted) as soon
+    # as the request is received, with a way to check the status (like nonces?)
+    return ok({
+        "success": True
+    })
+
+
+async def update_members_columnar(request: Request, decompressor):
+    """Update the members of a chunk in the columnar format. These chunks are compact enough to be read at once,
+    up to MAX_COLUMNAR_SIZE once decompressed."""
+
+    body = bytearray()
+
+    try:
+        async for data in request.stream():
+            for piece in decompressor.decompress(data):
+                body += piece
+
+            if len(body) > MAX_COLUMNAR_SIZE:
+                raise PayloadTooLarge(f"Columnar chunks may not be larger than {MAX_COLUMNAR_SIZE} bytes")
+
+        body += decompressor.flush()
+        payload = json.loads(body)
+        header = UpdateUsersPayload.model_validate(payload)
+        members = decode_members(payload)
+    except PayloadTooLarge as ex:
+        return status_code(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": str(ex)})
+    except (ValueError, ValidationError) as ex:
+        return bad_request({"error": f"Invalid chunk payload: {ex}"})
+
+    await process_update_members(members, header.guild_id, header.nonce)
+
+    return ok({
+        "success": True
+    })
+
+
+def as_member(member: MemberSerializable | MemberRecord) -> MemberSerializable:
+    """Turn a columnar member record into a full member model, with the same fields as a member of a JSON chunk.
+    Only done for members that are actually updated."""
+
+    if isinstance(member, MemberRecord):
+        return MemberSerializable(**member.to_dict())
+
+    return member
+
 
+@in_unit_of_work
+async def process_update_members(
+    members: Sequence[MemberSerializable | MemberRecord], guild_id: str, nonce: str, *, joins: bool = False
+):
+    """Process a list of members to update from the gateway.
+
+    Members whose fingerprint (roles, linked account, bound group ranks, the bind-config version and
+    the guild's settings) did not change since the last scan are skipped without touching the bind API
+    or Discord. Fingerprints are only saved for members whose binds were applied, so restricted or removed
+    members are always evaluated again.
+
+    With joins=True, the members are updated like single joins: they are never skipped, since a joining
+    member must always be evaluated, and they are sent the verified DM through the DM queue.
+
+    Member updates wait for a slot from the node's fair scheduler, which shares the node between guilds
+    by their premium tier.
+
+    When Discord keeps refusing our edits, the guild's permission breaker opens and the scan is stopped
+    on every node instead of sending more requests that will be refused.
+    """
+
+    if await is_breaker_open(guild_id):
+        await halt_progress(nonce, BREAKER_REASON)
+        return
+
+    fingerprint_context = FingerprintContext(
+        await binds.get_binds(guild_id), await binds.get_bind_config_version(guild_id), await fetch_guild_data(guild_id)
+    )
+    fingerprint_context.enabled = fingerprint_context.enabled and not joins
+    saved_fingerprints = (
+        await fetch_fingerprints(guild_id, [member.id for member in members if not member.is_bot])
+        if fingerprint_context.enabled else {}
+    )
+    new_fingerprints: dict[int, str] = {}
+
+    # one database query for the whole chunk instead of one per member
+    linked_accounts = await users.get_user_accounts([member.id for member in members if not member.is_bot], guild_id)
+
+    # so restriction checks of unverified members don't look their accounts up again
     for member in members:
-        if await redis.get(f"progress:{nonce}:cancelled"):
-            raise asyncio.CancelledError
+        if not member.is_bot:
+            users.prime_linked_account(member.id, guild_id, linked_accounts.get(member.id))
+
+    # load the groups of every linked account before any binds are evaluated
+    await users.sync_accounts(
+        [account for account in linked_accounts.values() if account.groups is None],
+        ["groups"],
+        concurrency=GROUP_SYNC_CONCURRENCY,
+    )
+
+    weight = tier_weight(await get_premium_status(guild_id=guild_id))
+
+    updated = skipped = 0
+
+    try:
+        for member in members:
+            if await redis.get(f"progress:{nonce}:cancelled"):
+                raise asyncio.CancelledError
+
+            if member.is_bot:
+                continue
+
+            logging.debug(f"Update endpoint: updating member: {member.username}")
+
+            try:
+                roblox_account = linked_accounts.get(member.id)
+
+                if fingerprint_context.enabled:
+                    if roblox_account and roblox_account.groups is None:
+                        await roblox_account.sync(["groups"])
+
+                    if saved_fingerprints.get(member.id) == member_fingerprint(member, roblox_account, fingerprint_context):
+                        skipped += 1
+                        continue
+
+                member = as_member(member)
+
+                await scheduler.acquire(guild_id, weight)
+                bot_response = await binds.apply_binds(
+                    member, guild_id, roblox_account, moderate_user=True,
+                    **({"update_embed_for_unverified": True, "mention_roles": False} if joins else {})
+                )
+            except BloxlinkForbidden:
+                if await record_forbidden(guild_id):
+                    await halt_progress(nonce, BREAKER_REASON)
+                    break
+
+                continue
+            except UPSTREAM_ERRORS:
+                await schedule_retry(guild_id, nonce, as_member(member))
+                continue
+
+            # the 403 count is shared with joins, retries and other nodes, so every success resets it
+            await reset_breaker(guild_id)
 
-        if member.is_bot:
-            continue
+            updated += 1
 
-        logging.debug(f"Update endpoint: updating member: {member.username}")
+            if joins:
+                await queue_dm(QueuedDM(
+                    guild_id=guild_id,
+                    user_id=member.id,
+                    content=bot_response.content,
+                    embed=bot_response.embed,
+                    components=bot_response.action_rows,
+                ))
 
+            if fingerprint_context.enabled and bot_response.binds_applied:
+                # apply_binds keeps the member's roles and nickname current, so this is the state the next scan will see
+                new_fingerprints[member.id] = member_fingerprint(member, roblox_account, fingerprint_context)
+
+    finally:
+        await save_fingerprints(guild_id, new_fingerprints)
+        await increment_progress_stats(nonce, updated=updated, skipped=skipped)
+
+        logging.debug(f"Update endpoint: updated {updated} and skipped {skipped} unchanged members of {guild_id}")
+
+
+async def flush_join_burst(guild_id: str):
+    """Update the queued joins of a guild in batches through the chunk pipeline until its burst is over.
+    Runs on the node that holds the guild's flusher claim. The verified DMs go through the rate-limited DM queue.
+    """
+
+    while True:
         try:
-            roblox_account = await get_user_account(member.id, guild_id=guild_id, raise_errors=False)
+            async with keep_join_flusher(guild_id):
+                while True:
+                    await asyncio.sleep(JOIN_BATCH_DELAY)
+
+                    members = await take_queued_joins(guild_id)
+
+                    if not members:
+                        break
+
+                    guild_data = await fetch_guild_data(
+                        guild_id, "autoRoles", "autoVerification", "highTrafficServer"
+                    )
+
+                    if guild_data.highTrafficServer or not (guild_data.autoVerification or guild_data.autoRoles):
+                        continue
+
+                    nonce = f"joins:{guild_id}:{uuid.uuid4().hex}"
+
+                    for i in range(0, len(members), JOIN_BATCH_SIZE):
+                        with load_monitor.track("join_batch"):
+                            await process_update_members(
+                                members[i:i + JOIN_BATCH_SIZE], guild_id, nonce, joins=True
+                            )
+        finally:
+            await release_join_flusher(guild_id)
+
+        # a join can be queued after the last batch was taken but before the claim was released
+        if not await has_queued_joins(guild_id) or not await claim_join_flusher(guild_id):
+            return
+
+
+@in_unit_of_work
+async def retry_update_member(entry: RetryEntry):
+    """Retry the update of a member that failed because of an upstream error."""
+
+    guild_id = entry.guild_id
+    member = entry.member
+
+    if await is_cancelled(entry.nonce) or await is_breaker_open(guild_id):
+        return
+
+    try:
+        roblox_account = await users.get_linked_account(member.id, guild_id)
+
+        with load_monitor.track("retry"):
+            await scheduler.acquire(guild_id)
             await binds.apply_binds(member, guild_id, roblox_account, moderate_user=True)
-        except (BloxlinkForbidden, RobloxDown):
-            # bloxlink doesn't have permissions to give roles... might be good to
-            # TODO: stop after n attempts where this is received so that way we don't flood discord with
-            # 403 codes.
-            continue
+    except BloxlinkForbidden:
+        if await record_forbidden(guild_id):
+            await halt_progress(entry.nonce, BREAKER_REASON)
+
+        return
+    except UPSTREAM_ERRORS:
+        await schedule_retry(guild_id, entry.nonce, member, attempt=entry.attempt + 1)
+        return
+
+    await reset_breaker(guild_id)
+    await increment_progress_stats(entry.nonce, updated=1)
+
+
+@webserver.on_start
+async def start_retry_worker(_):
+    """Start draining the retry queue on this node."""
+
+    create_task_log_exception(run_retry_worker(retry_update_member))
+
+
+@webserver.on_start
+async def start_dm_worker(_):
+    """Start sending queued direct messages on this node."""
 
-        await asyncio.sleep(1)
+    create_task_log_exception(run_dm_worker())
@@ -0,0 +1,22 @@
+from blacksheep import Request, ok
+from blacksheep.server.controllers import APIController, post
+
+from resources.reverse_lookup import invalidate_reverse_lookup
+
+from ..decorators import authenticate
+
+
+class Users(APIController):
+    """Results in a path of <URL>/api/users/..."""
+
+    @post("/roblox/{roblox_id}/invalidate")
+    @authenticate()
+    async def invalidate_roblox_links(self, roblox_id: str, request: Request):
+        """Endpoint for the verification service to report that a Roblox account was linked or unlinked.
+        Writes made by this service go through resources.reverse_lookup.update_user_data() instead."""
+
+        await invalidate_reverse_lookup(roblox_id)
+
+        return ok({
+            "success": True,
+        })
@@ -0,0 +1,379 @@
+import codecs
+import json
+import re
+import zlib
+from typing import Iterator
+
+try:
+    import zstandard
+except ImportError: # optional, only needed when the gateway compresses with zstd
+    zstandard = None
+
+
+__all__ = ("PayloadTooLarge", "UnsupportedEncoding", "BoundedDecompressor", "decompressor_for", "JSONArrayStream")
+
+# The largest single element (or header value) we buffer while waiting for the rest of it.
+MAX_ELEMENT_SIZE = 1024 * 1024
+
+# The most a body may inflate to. Far more than any real chunk, but it stops gzip and zstd bombs.
+MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+
+# Decompressed output is handed out in pieces of at most this size, so one small piece of the body
+# can't inflate into a huge buffer. Only gzip supports this, zstd output is bounded by MAX_DECOMPRESSED_SIZE.
+MAX_PIECE_SIZE = 256 * 1024
+
+DECOMPRESSION_ERRORS = (zlib.error, zstandard.ZstdError) if zstandard else (zlib.error,)
+
+WHITESPACE = " \t\n\r"
+
+# What the scanner of JSONArrayStream looks for: the end of a number or literal, the characters that matter
+# inside a string, and the ones that matter outside of one.
+SCALAR_END = re.compile(r"[,\]}\s]")
+STRING_SPECIAL = re.compile(r'["\\]')
+STRUCTURE = re.compile(r'[\[\]{}"]')
+
+
+class PayloadTooLarge(ValueError):
+    """Raised when a single element of a streamed payload is larger than MAX_ELEMENT_SIZE,
+    or when the body inflates to more than MAX_DECOMPRESSED_SIZE."""
+
+
+class UnsupportedEncoding(ValueError):
+    """Raised when a request body uses a Content-Encoding we can't decode."""
+
+
+class _Identity:
+    @staticmethod
+    def decompress(data: bytes) -> bytes:
+        return data
+
+    @staticmethod
+    def flush() -> bytes:
+        return b""
+
+
+class BoundedDecompressor:
+    """Decompresses a body piece by piece without letting it inflate past MAX_DECOMPRESSED_SIZE.
+
+    Corrupt data raises a ValueError instead of the error type of the compression library.
+    """
+
+    def __init__(self, decompressor):
+        self._decompressor = decompressor
+        self._size = 0
+
+        # zlib's decompressors can stop at a maximum output size and keep the rest of the input for later
+        self._bounded_output = hasattr(decompressor, "unconsumed_tail")
+
+    def _count(self, piece: bytes) -> bytes:
+        self._size += len(piece)
+
+        if self._size > MAX_DECOMPRESSED_SIZE:
+            raise PayloadTooLarge(f"The payload is larger than {MAX_DECOMPRESSED_SIZE} bytes once decompressed")
+
+        return piece
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        """Decompress the next piece of the body.
+
+        Raises:
+            ValueError: When the data is corrupt.
+            PayloadTooLarge: When the body inflates to more than MAX_DECOMPRESSED_SIZE.
+
+        Yields:
+            bytes: The decompressed data, in pieces of at most MAX_PIECE_SIZE for gzip.
+        """
+
+        try:
+            if not self._bounded_output:
+                yield self._count(self._decompressor.decompress(data))
+                return
+
+            while data:
+                piece = self._decompressor.decompress(data, MAX_PIECE_SIZE)
+                data = self._decompressor.unconsumed_tail
+
+                yield self._count(piece)
+        except DECOMPRESSION_ERRORS as ex:
+            raise ValueError(f"The payload could not be decompressed: {ex}") from ex
+
+    def flush(self) -> bytes:
+        """Decompress whatever is left once the whole body was fed."""
+
+        try:
+            return self._count(self._decompressor.flush())
+        except DECOMPRESSION_ERRORS as ex:
+            raise ValueError(f"The payload could not be decompressed: {ex}") from ex
+
+
+def decompressor_for(content_encoding: str | None) -> BoundedDecompressor:
+    """Get an incremental decompressor for a Content-Encoding header value.
+
+    Args:
+        content_encoding (str | None): The Content-Encoding of the request body.
+
+    Raises:
+        UnsupportedEncoding: When the encoding isn't gzip, zstd or identity.
+
+    Returns:
+        BoundedDecompressor: A decompressor that can be fed the body piece by piece.
+    """
+
+    match (content_encoding or "identity").strip().lower():
+        case "identity":
+            return BoundedDecompressor(_Identity())
+        case "gzip":
+            return BoundedDecompressor(zlib.decompressobj(wbits=zlib.MAX_WBITS | 16))
+        case "zstd" if zstandard:
+            return BoundedDecompressor(zstandard.ZstdDecompressor().decompressobj())
+        case encoding:
+            raise UnsupportedEncoding(f"Unsupported Content-Encoding: {encoding}")
+
+
+class JSONArrayStream:
+    """Incrementally parses a JSON object with one large array in it, such as
+    {"guild_id": ..., "nonce": ..., "members": [{...}, {...}]}.
+
+    Elements of the array are returned as soon as they are complete, so only one element has to be held in memory
+    at a time. Every other key of the object is collected into `header`.
+
+    A value is only decoded once it is complete. Until then, each feed only scans the new data for the end of it,
+    so a large value that arrives in many pieces is not parsed again from its start every time.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.header: dict = {}
+
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._state = "start"
+        self._key: str = None
+        self._finished = False
+
+        # how far the value at the current position has been scanned, relative to the position
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data: bytes, *, final: bool = False) -> list:
+        """Feed the next piece of the body.
+
+        Args:
+            data (bytes): The next piece of the (decompressed) body.
+            final (bool, optional): Whether this is the last piece. Defaults to False.
+
+        Raises:
+            ValueError: When the body isn't valid JSON of the expected shape.
+            PayloadTooLarge: When a single element is too large.
+
+        Returns:
+            list: The elements of the array that were completed by this piece.
+        """
+
+        self._buffer = self._buffer[self._position:] + self._text_decoder.decode(data, final=final)
+        self._position = 0
+
+        elements = []
+
+        while self._step(elements, final):
+            pass
+
+        if len(self._buffer) - self._position > MAX_ELEMENT_SIZE:
+            raise PayloadTooLarge(f"An element of {self.array_key} is larger than {MAX_ELEMENT_SIZE} bytes")
+
+        if final and not self._finished:
+            raise ValueError("The payload ended before the JSON object was complete")
+
+        return elements
+
+    def _skip_whitespace(self):
+        while self._position < len(self._buffer) and self._buffer[self._position] in WHITESPACE:
+            self._position += 1
+
+    def _next_char(self) -> str | None:
+        self._skip_whitespace()
+
+        return self._buffer[self._position] if self._position < len(self._buffer) else None
+
+    def _value_end(self, final: bool) -> int | None:
+        """Find where the value at the current position ends, or return None if it hasn't arrived yet.
+        Resumes scanning where the previous feed stopped."""
+
+        buffer = self._buffer
+        position = self._position + self._scanned
+
+        if buffer[self._position] not in "{[\"":
+            # numbers and literals end at the next delimiter, which tells them apart from truncated ones
+            match = SCALAR_END.search(buffer, position)
+
+            if match is not None:
+                return match.start()
+
+            if final:
+                return len(buffer)
+
+            self._scanned = len(buffer) - self._position
+            return None
+
+        while True:
+            match = (STRING_SPECIAL if self._in_string else STRUCTURE).search(buffer, position)
+
+            if match is None:
+                position = len(buffer)
+                break
+
+            char = match.group()
+            position = match.end()
+
+            if self._in_string:
+                if char == "\\":
+                    if position == len(buffer):
+                        # the escaped character hasn't arrived yet, so scan the backslash again next time
+                        position -= 1
+                        break
+
+                    position += 1
+                    continue
+
+                self._in_string = False
+
+                if self._depth == 0:
+                    return position
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+
+                if self._depth == 0:
+                    return position
+
+        self._scanned = position - self._position
+
+        return None
+
+    def _decode_value(self, final: bool):
+        """Decode the value at the current position, or return Ellipsis if it isn't complete yet."""
+
+        end = self._value_end(final)
+
+        if end is None:
+            return ...
+
+        self._scanned = self._depth = 0
+        self._in_string = False
+
+        # raises for malformed values, such as an empty one where a value was expected
+        value, decoded_end = self._decoder.raw_decode(self._buffer, self._position)
+
+        if decoded_end != end:
+            raise ValueError(f"Unexpected data at position {decoded_end} of the value")
+
+        self._position = end
+
+        return value
+
+    def _step(self, elements: list, final: bool) -> bool:
+        """Advance the parser by one token. Returns False when more data is needed."""
+
+        char = self._next_char()
+
+        if char is None:
+            return False
+
+        match self._state:
+            case "start":
+                if char != "{":
+                    raise ValueError("Expected a JSON object")
+
+                self._position += 1
+                self._state = "first_key"
+
+            case "first_key" | "key":
+                if char == "}" and self._state == "first_key":
+                    self._position += 1
+                    self._state = "end"
+                    self._finished = True
+                    return True
+
+                if char != '"':
+                    raise ValueError("Expected a key")
+
+                key = self._decode_value(final)
+
+                if key is ...:
+                    return False
+
+                self._key = key
+                self._state = "colon"
+
+            case "colon":
+                if char != ":":
+                    raise ValueError("Expected ':' after a key")
+
+                self._position += 1
+                self._state = "value"
+
+            case "value":
+                if self._key == self.array_key:
+                    if char != "[":
+                        raise ValueError(f"Expected {self.array_key} to be an array")
+
+                    self._position += 1
+                    self._state = "first_element"
+                    return True
+
+                value = self._decode_value(final)
+
+                if value is ...:
+                    return False
+
+                self.header[self._key] = value
+                self._state = "after_value"
+
+            case "after_value":
+                if char == ",":
+                    self._position += 1
+                    self._state = "key"
+                elif char == "}":
+                    self._position += 1
+                    self._state = "end"
+                    self._finished = True
+                else:
+                    raise ValueError("Expected ',' or '}' after a value")
+
+            case "first_element" | "element":
+                if char == "]" and self._state == "first_element":
+                    self._position += 1
+                    self._state = "after_value"
+                    return True
+
+                if char in ",]":
+                    raise ValueError(f"Expected an element of {self.array_key}")
+
+                element = self._decode_value(final)
+
+                if element is ...:
+                    return False
+
+                elements.append(element)
+                self._state = "after_element"
+
+            case "after_element":
+                if char == ",":
+                    self._position += 1
+                    self._state = "element"
+                elif char == "]":
+                    self._position += 1
+                    self._state = "after_value"
+                else:
+                    raise ValueError(f"Expected ',' or ']' after an element of {self.array_key}")
+
+            case "end":
+                raise ValueError("Unexpected data after the JSON object")
+
+        return True